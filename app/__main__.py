@@ -1,9 +1,253 @@
 #!/usr/bin/env python3
 
-from controllers.controller import Controller
+import time
+
+# Instante de arranque, para medir el tiempo hasta que se muestra la ventana
+STARTED = time.perf_counter()
+
+import argparse
+
+def parse_args():
+    """
+    Analiza los argumentos de la línea de comandos. Sin comando se abre la interfaz 
+    gráfica.
+    """
+    parser = argparse.ArgumentParser(prog='app', description="Agenda de contactos")
+    parser.add_argument('--startup-log', metavar='FILE',
+                        help="añadir los tiempos de arranque a FILE (CSV)")
+    parser.add_argument('--profile', metavar='DIR',
+                        help="perfilar cada acción y guardar los informes en DIR")
+    commands = parser.add_subparsers(dest='command')
+
+    maintenance = commands.add_parser('maintenance', help="mantenimiento de la base de datos")
+    maintenance.add_argument('--budget', type=float, default=5.0,
+                             help="tiempo máximo de cada tarea, en segundos (por defecto 5)")
+    maintenance.add_argument('--enable-incremental-vacuum', action='store_true',
+                             help="convertir una base de datos antigua al modo de vacuum "
+                                  "incremental (VACUUM completo, una sola vez)")
+
+    importer = commands.add_parser('import', help="importar un fichero CSV (reanudable)")
+    importer.add_argument('file', help="fichero CSV con cabeceras NOMBRE, TELEFONO")
+    importer.add_argument('--batch-size', type=int, default=None,
+                          help="filas por lote (por defecto AGENDA_IMPORT_BATCH_SIZE o 1000)")
+    importer.add_argument('--restart', action='store_true',
+                          help="ignorar el estado guardado y empezar desde el principio")
+
+    dedupe = commands.add_parser('dedupe', help="buscar contactos duplicados")
+    dedupe.add_argument('--threshold', type=float, default=None,
+                        help="similitud mínima, de 0 a 1 (por defecto AGENDA_DEDUPE_THRESHOLD o 0.85)")
+    dedupe.add_argument('--merge', action='store_true',
+                        help="fusionar los duplicados con el mismo teléfono, conservando el "
+                             "registro de menor ID (pide confirmación)")
+    dedupe.add_argument('--different-numbers', action='store_true',
+                        help="con --merge, eliminar también los duplicados con otro teléfono "
+                             "(revisar antes la lista)")
+    dedupe.add_argument('--yes', action='store_true',
+                        help="no pedir confirmación antes de fusionar")
+
+    migrate = commands.add_parser('migrate', help="actualizar el esquema de la base de datos")
+    migrate.add_argument('--batch-size', type=int, default=1000,
+                         help="registros copiados por transacción (por defecto 1000)")
+    migrate.add_argument('--pause', type=float, default=0.01,
+                         help="segundos de espera entre lotes (por defecto 0.01)")
+
+    rebalance = commands.add_parser('rebalance', help="redistribuir los registros entre los shards")
+    rebalance.add_argument('--shards', type=int, required=True,
+                           help="nuevo número de shards")
+    rebalance.add_argument('--chunk-size', type=int, default=1000,
+                           help="registros copiados por bloque (por defecto 1000)")
+
+    return parser.parse_args()
+
+
+def maintenance(args):
+    """
+    Ejecuta una pasada de mantenimiento sobre la base de datos configurada.
+    """
+    import config
+    from model.repository.factory import create_repository
+    from model.maintenance.tasks import run_maintenance, enable_incremental_vacuum, format_report
+
+    repo = create_repository(config.BACKEND, config.DATABASE, config.SNAPSHOT, config.SHARDS)
+    files = repo.database_files()
+    repo.close()
+
+    if not files:
+        print("El motor de almacenamiento actual no necesita mantenimiento")
+        return
+
+    # Conversión única de las bases de datos antiguas, antes de las tareas habituales
+    if args.enable_incremental_vacuum:
+        for db in files:
+            print(f"{db}: incremental vacuum {enable_incremental_vacuum(db)}")
+
+    report = {db: run_maintenance(db, args.budget) for db in files}
+    print(format_report(report))
+
+
+def import_csv(args):
+    """
+    Importa un fichero CSV sin interfaz gráfica, reanudando la importación anterior si
+    quedó a medias.
+    """
+    import config
+    from model.repository.factory import create_repository
+    from model.services.record_importer import RecordImporter, FileChangedError
+
+    repo = create_repository(config.BACKEND, config.DATABASE, config.SNAPSHOT, config.SHARDS)
+    service = RecordImporter(repo)
+
+    try:
+        report = service.import_csv(args.file, args.batch_size or config.IMPORT_BATCH_SIZE,
+                                    restart=args.restart)
+    except FileChangedError as e:
+        print(f"{e} (--restart)")
+        return
+    except (ValueError, OSError) as e:
+        print(e)
+        return
+    finally:
+        repo.close()
+
+    print(service.format_report(report))
+
+
+def dedupe(args):
+    """
+    Busca contactos duplicados y, con --merge, los fusiona.
+    """
+    import config
+    from model.repository.factory import create_repository
+    from model.dedupe.engine import DedupeEngine
+
+    repo = create_repository(config.BACKEND, config.DATABASE, config.SNAPSHOT, config.SHARDS)
+    engine = DedupeEngine(repo, threshold=args.threshold or config.DEDUPE_THRESHOLD,
+                          archive=config.DEDUPE_ARCHIVE)
+
+    try:
+        clusters = engine.find_duplicates()
+        print(engine.format_clusters(clusters, limit=len(clusters)))
+
+        if not args.merge:
+            return
+
+        # Registros que se eliminarían: con el mismo teléfono, y además con otro
+        same = sum(len(engine.merge_plan(cluster)) for cluster in clusters)
+        different = sum(len(engine.merge_plan(cluster, different_numbers=True))
+                        for cluster in clusters) - same
+
+        print(f"Duplicados con el mismo teléfono: {same}")
+        print(f"Duplicados con otro teléfono: {different}"
+              + ("" if args.different_numbers else " (se conservan; ver --different-numbers)"))
+
+        total = same + different if args.different_numbers else same
+        if not total:
+            return
+
+        # Confirmar antes de eliminar
+        if not args.yes:
+            answer = input(f"¿Eliminar {total} registros? Se guardan en {engine.archive} [s/N] ")
+            if answer.strip().lower() not in ('s', 'si', 'sí', 'y', 'yes'):
+                print("Cancelado")
+                return
+
+        removed = sum(len(engine.merge(cluster, different_numbers=args.different_numbers))
+                      for cluster in clusters)
+        print(f"Registros eliminados: {removed} (guardados en {engine.archive})")
+    finally:
+        engine.close()
+        repo.close()
+
+
+def migrate(args):
+    """
+    Aplica las migraciones pendientes del esquema. La base de datos se puede seguir 
+    usando mientras tanto.
+    """
+    import config
+    from model.repository.factory import create_repository
+    from model.sql.migrator import Migrator
+
+    repo = create_repository(config.BACKEND, config.DATABASE, config.SNAPSHOT, config.SHARDS)
+    files = repo.database_files()
+    repo.close()
+
+    def progress(migration, copied, total):
+        print(f"\r  migración {migration.VERSION}: {copied}/{total}", end='', flush=True)
+
+    for db in files:
+        migrator = Migrator(db, args.batch_size, args.pause)
+        print(f"{db}: versión {migrator.version()}")
+        for description, note in migrator.run(progress):
+            print(f"\n  aplicada la migración {description}")
+            if note:
+                print(f"  AVISO: {note}")
+        print(f"{db}: versión {migrator.version()}")
+
+
+def rebalance(args):
+    """
+    Redistribuye los registros del motor 'sharded' entre un nuevo número de shards. La 
+    aplicación debe estar cerrada mientras tanto.
+    """
+    import config
+    from model.repository.factory import create_repository
+    from model.repository.sharded_repo import ShardedRepository
+
+    if args.shards < 1:
+        print("El número de shards debe ser al menos 1")
+        return
+
+    repo = create_repository(config.BACKEND, config.DATABASE, config.SNAPSHOT, config.SHARDS)
+    if not isinstance(repo, ShardedRepository):
+        print("El motor de almacenamiento actual no usa shards (AGENDA_BACKEND=sharded)")
+        repo.close()
+        return
+
+    def progress(copied):
+        print(f"\r  copiados: {copied}", end='', flush=True)
+
+    try:
+        before = repo.n
+        copied = repo.rebalance(args.shards, args.chunk_size, progress)
+    finally:
+        repo.close()
+
+    print(f"\nShards: {before} -> {args.shards} ({copied} registros redistribuidos)")
+
 
 def main():
-    app = Controller()
+    args = parse_args()
+
+    if args.command == 'maintenance':
+        maintenance(args)
+        return
+
+    if args.command == 'import':
+        import_csv(args)
+        return
+
+    if args.command == 'dedupe':
+        dedupe(args)
+        return
+
+    if args.command == 'migrate':
+        migrate(args)
+        return
+
+    if args.command == 'rebalance':
+        rebalance(args)
+        return
+
+    import config
+    if args.startup_log:
+        config.STARTUP_LOG = args.startup_log
+    if args.profile:
+        config.PROFILE_DIR = args.profile
+
+    # Se importa aquí para que los comandos sin interfaz gráfica no carguen tkinter
+    from controllers.controller import Controller
+    app = Controller(started=STARTED)
     app.run()
 
 if __name__ == '__main__':
@@ -0,0 +1,97 @@
+"""
+ - Fichero: bench_backends.py
+ - Descripción: Compara el rendimiento de los motores de almacenamiento
+ - Uso (desde el directorio app): python -m benchmarks.bench_backends [-n N]
+"""
+from model.data.record import Record
+from model.repository.factory import BACKENDS, create_repository
+import argparse, os, tempfile, time
+
+
+def timed(fn, *args) -> float:
+    """
+    Ejecuta fn(*args) y devuelve el tiempo transcurrido en segundos.
+    """
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def make_records(n: int) -> list:
+    """
+    Genera 'n' registros sintéticos con teléfonos de 9 dígitos.
+    """
+    return [Record(name=f"Contacto {i}", number=str(600000000 + i)) for i in range(n)]
+
+
+def crud_workload(repo, n: int) -> dict:
+    """
+    Operaciones individuales, como las lanza la interfaz: n inserciones, una lectura
+    completa de la tabla, n actualizaciones y n borrados.
+    """
+    records = make_records(n)
+
+    def insert():
+        for record in records:
+            record.id = repo.insert(record)
+
+    def update():
+        for record in records:
+            record.name += " bis"
+            repo.update(record)
+
+    def delete():
+        for record in records:
+            repo.delete(record)
+
+    return {
+        'insert': timed(insert),
+        'get_all': timed(repo.get_all),
+        'update': timed(update),
+        'delete': timed(delete),
+    }
+
+
+def bulk_workload(repo, n: int) -> dict:
+    """
+    Operaciones sobre la tabla completa: lectura, actualización por lotes, agregación y
+    borrado total.
+    """
+    records = make_records(n)
+    for record in records:
+        record.id = repo.insert(record)
+
+    return {
+        'get_all': timed(repo.get_all),
+        'update_many': timed(repo.update_many, records),
+        'count': timed(repo.count),
+        'count_by_prefix': timed(repo.count_by_prefix, 3),
+        'delete_all': timed(repo.delete_all),
+    }
+
+
+def run(n: int) -> None:
+    """
+    Ejecuta las cargas de trabajo sobre cada motor e imprime una tabla de resultados.
+    """
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for workload in (crud_workload, bulk_workload):
+            print(f"\n{workload.__name__} (n={n})")
+
+            for i, backend in enumerate(BACKENDS):
+                db = os.path.join(tmpdir, f"{workload.__name__}_{backend}.db")
+                repo = create_repository(backend, db)
+                results = workload(repo, n)
+                repo.close()
+
+                # Cabecera con los nombres de las operaciones
+                if i == 0:
+                    print(f"{'backend':<15}" + "".join(f"{op:>17}" for op in results))
+                print(f"{backend:<15}" + "".join(f"{t * 1000:>15.1f}ms" for t in results.values()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark de los motores de almacenamiento")
+    parser.add_argument('-n', type=int, default=1000, help="número de registros (por defecto 1000)")
+    args = parser.parse_args()
+    run(args.n)
@@ -0,0 +1,66 @@
+"""
+ - Fichero: bench_sharding.py
+ - Descripción: Compara una base de datos SQLite única con el motor 'sharded'
+ - Uso (desde el directorio app): python -m benchmarks.bench_sharding [-n N] [--shards 2 4 8]
+"""
+from model.repository.factory import create_repository
+from .bench_backends import timed, make_records
+import argparse, os, tempfile
+
+
+def query_workload(repo, n: int) -> dict:
+    """
+    Carga inicial con import_batch (una transacción por lote de 1000 registros) y
+    consultas sobre la tabla completa, que en el motor 'sharded' se reparten entre los
+    shards en paralelo.
+    """
+    records = make_records(n)
+
+    def load():
+        for i in range(0, n, 1000):
+            batch = records[i:i + 1000]
+            state = {'size': 0, 'offset': 0, 'batch': i // 1000 + 1, 'rows': i + len(batch),
+                     'inserted': i + len(batch), 'rejected': 0, 'done': False}
+            repo.import_batch('bench.csv', batch, state)
+
+    return {
+        'import_batch': timed(load),
+        'get_all': timed(repo.get_all),
+        'search': timed(repo.search, "Contacto 12"),
+        'count': timed(repo.count),
+        'count_by_prefix': timed(repo.count_by_prefix, 3),
+        'id_range': timed(repo.id_range),
+        'delete_all': timed(repo.delete_all),
+    }
+
+
+def run(n: int, shards: list) -> None:
+    """
+    Ejecuta la carga de trabajo sobre un único fichero y sobre cada número de shards e
+    imprime una tabla de resultados.
+    """
+    configs = [('sqlite', 1)] + [('sharded', k) for k in shards]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        print(f"\nquery_workload (n={n})")
+
+        for i, (backend, k) in enumerate(configs):
+            db = os.path.join(tmpdir, f"{backend}_{k}.db")
+            repo = create_repository(backend, db, shards=k)
+            results = query_workload(repo, n)
+            repo.close()
+
+            # Cabecera con los nombres de las operaciones
+            if i == 0:
+                print(f"{'backend':<15}" + "".join(f"{op:>17}" for op in results))
+            label = backend if backend == 'sqlite' else f"{backend}({k})"
+            print(f"{label:<15}" + "".join(f"{t * 1000:>15.1f}ms" for t in results.values()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark del motor 'sharded'")
+    parser.add_argument('-n', type=int, default=100000, help="número de registros (por defecto 100000)")
+    parser.add_argument('--shards', type=int, nargs='+', default=[2, 4, 8],
+                        help="números de shards a comparar (por defecto 2 4 8)")
+    args = parser.parse_args()
+    run(args.n, args.shards)
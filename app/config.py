@@ -0,0 +1,42 @@
+"""
+ - Fichero: config.py
+ - Descripción: Configuración de la aplicación, a partir de variables de entorno
+ - Autor: Alejandro Ruiz Becerra
+"""
+import os
+
+# Motor de almacenamiento: 'sqlite', 'sqlite-memory', 'memory' o 'sharded'
+BACKEND = os.environ.get('AGENDA_BACKEND', 'sqlite')
+
+# Fichero de la base de datos SQLite
+DATABASE = os.environ.get('AGENDA_DB', 'v2.db')
+
+# Fichero de snapshot del motor 'memory' (vacío: sin persistencia)
+SNAPSHOT = os.environ.get('AGENDA_SNAPSHOT') or None
+
+# Número de shards del motor 'sharded' al crear una base de datos nueva
+SHARDS = int(os.environ.get('AGENDA_SHARDS', 4))
+
+# Mantenimiento en segundo plano: segundos sin actividad antes de lanzarlo, segundos
+# mínimos entre dos pasadas y tiempo máximo de cada tarea
+MAINTENANCE_IDLE = float(os.environ.get('AGENDA_MAINTENANCE_IDLE', 60))
+MAINTENANCE_INTERVAL = float(os.environ.get('AGENDA_MAINTENANCE_INTERVAL', 3600))
+MAINTENANCE_BUDGET = float(os.environ.get('AGENDA_MAINTENANCE_BUDGET', 0.5))
+
+# Filas por lote (y por transacción) al importar ficheros CSV
+IMPORT_BATCH_SIZE = int(os.environ.get('AGENDA_IMPORT_BATCH_SIZE', 1000))
+
+# Similitud mínima (0 a 1) entre dos nombres para considerarlos duplicados
+DEDUPE_THRESHOLD = float(os.environ.get('AGENDA_DEDUPE_THRESHOLD', 0.85))
+
+# Fichero CSV donde se guardan los registros eliminados al fusionar duplicados
+DEDUPE_ARCHIVE = os.environ.get('AGENDA_DEDUPE_ARCHIVE', 'dedupe_removed.csv')
+
+# Registros que se añaden a la ventana en cada paso de la carga inicial
+STARTUP_CHUNK_SIZE = int(os.environ.get('AGENDA_STARTUP_CHUNK_SIZE', 500))
+
+# Fichero CSV al que se añaden los tiempos de arranque (vacío: no se guardan)
+STARTUP_LOG = os.environ.get('AGENDA_STARTUP_LOG') or None
+
+# Directorio de los informes de perfilado (vacío: perfilado desactivado)
+PROFILE_DIR = os.environ.get('AGENDA_PROFILE') or None
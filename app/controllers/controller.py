@@ -4,15 +4,21 @@
  - Autor: Alejandro Ruiz Becerra
 """
 from model.data.record import Record
-from model.repository.record_repo import RecordRepository
+from model.repository.factory import create_repository
 from model.services.record_creator import RecordCreator
 from model.services.record_getter import RecordGetter
 from model.services.record_updater import RecordUpdater
 from model.services.record_deleter import RecordDeleter
+from model.services.record_tracker import RecordTracker
+from model.maintenance.scheduler import MaintenanceScheduler
 from views.view import MainWindow
-from tkinter.filedialog import askopenfilename
-from tkinter.messagebox import showinfo
-import csv
+from tkinter.messagebox import showinfo, askyesno
+import config
+import itertools, os, queue, time
+
+# Los módulos que solo usan opciones del menú (csv, tkinter.filedialog, el importador, el
+# detector de duplicados...) se importan dentro de los métodos que los necesitan, para
+# no retrasar el arranque.
 
 
 class Controller():
@@ -21,16 +27,43 @@ class Controller():
     la comunicación entre el modelo (backend) y la interfaz gráfica de usuario (frontend).
     """
 
-    def __init__(self):
+    # Acciones que se miden en el modo de perfilado
+    PROFILED_ACTIONS = ['insert', 'update', 'remove', 'remove_all', 'read_csv', 'write_csv']
+
+    def __init__(self, started : float = None):
         """
         Inicializador
+
+        Parámetros:
+            - started (float): instante de arranque del proceso (time.perf_counter), para
+              medir el tiempo de arranque. Por defecto, el de creación del controlador.
         """
-        # Modelo
-        self.repo = RecordRepository('v2.db')
+        self.started = started or time.perf_counter()
+
+        # Modelo. El motor de almacenamiento se elige en la configuración
+        self.repo = create_repository(config.BACKEND, config.DATABASE, config.SNAPSHOT, config.SHARDS)
+
+        # Mantenimiento de la base de datos en segundo plano
+        self.maintenance = MaintenanceScheduler(
+            self.repo.database_files(),
+            idle=config.MAINTENANCE_IDLE,
+            interval=config.MAINTENANCE_INTERVAL,
+            budget=config.MAINTENANCE_BUDGET
+        )
+        self.maintenance_reports = queue.Queue()
 
         # Inicializar la interfaz gráfica de Tkinter
         self.view = MainWindow()
 
+        # Modo de perfilado: envolver las acciones antes de asignarlas a la interfaz
+        self.profiler = None
+        if config.PROFILE_DIR:
+            from profiling import Profiler
+
+            self.profiler = Profiler(config.PROFILE_DIR)
+            for action in self.PROFILED_ACTIONS:
+                setattr(self, action, self.profiler.wrap(action, getattr(self, action)))
+
         # Configurar la interfaz gráfica
         self._config_view()
 
@@ -40,73 +73,159 @@ class Controller():
         Configura la interfaz gráfica
         """
         # Configurar método de salida
-        self.view.protocol("WM_DELETE_WINDOW", self.view.exit)
+        self.view.protocol("WM_DELETE_WINDOW", self.exit)
 
         # Configurar el menú
         self.view.menu.add_command(label="Import from CSV", command=self.read_csv)
         self.view.menu.add_command(label="Export to CSV", command=self.write_csv)
+        self.view.menu.add_command(label="Export changes to CSV", command=self.write_delta_csv)
+        self.view.menu.add_command(label="Change prefix", command=self.change_prefix)
+        self.view.menu.add_command(label="Find duplicates", command=self.find_duplicates)
+        self.view.menu.add_command(label="Maintenance", command=self.run_maintenance)
         self.view.config(menu=self.view.menu)
 
+        # Cualquier pulsación cuenta como actividad y aplaza el mantenimiento
+        self.view.bind_all("<Any-ButtonPress>", lambda e: self.maintenance.touch(), add='+')
+        self.view.bind_all("<Any-KeyPress>", lambda e: self.maintenance.touch(), add='+')
+
         # Configurar botones
         self.view.set_add_button_handler(self.insert)
         self.view.set_update_button_handler(self.update)
         self.view.set_remove_button_handler(self.remove)
         self.view.set_remove_all_button_handler(self.remove_all)
 
-        # Enviar los datos a la interfaz gráfica
-        for row in self.get_all():
-            # Encapsular datos
-            record = Record(row[0], row[1], row[2])
-            self.view.add_record(record.__dict__)
+        # Inicializar la barra de estado con consultas de agregación
+        self._init_status()
 
+        # Enviar los datos a la interfaz gráfica por bloques, cuando la ventana ya se ha
+        # mostrado y entre eventos del usuario
+        self.timings = {'init': time.perf_counter() - self.started}
+        self.loader = self.repo.iter_chunks(config.STARTUP_CHUNK_SIZE)
+        self.view.after_idle(self._load_chunk)
 
-    def run(self):
+
+    def _load_chunk(self) -> None:
         """
-        Lanza la aplicación.
+        Añade a la interfaz gráfica el siguiente bloque de registros y programa el 
+        siguiente. Los eventos pendientes se atienden entre un bloque y otro.
         """
-        self.view.mainloop()
+        # La primera llamada se produce cuando la ventana ya se ha dibujado
+        if 'window' not in self.timings:
+            self.timings['window'] = time.perf_counter() - self.started
+
+        if self.profiler:
+            self.profiler.resume('startup')
+
+        # Carga cancelada (por ejemplo, se han eliminado todos los registros)
+        rows = next(self.loader, None) if self.loader else None
+
+        if rows is None:
+            self.loader = None
+            self.timings['loaded'] = time.perf_counter() - self.started
+            if self.profiler:
+                self.profiler.finish('startup')
+            self._log_startup()
+            return
 
+        # Encapsular datos
+        self.view.add_records(Record(*row).__dict__ for row in rows)
 
-    def is_valid_record(self, record : Record) -> bool:
+        if self.profiler:
+            self.profiler.pause('startup')
+        self.view.after_idle(self._load_chunk)
+
+
+    def _log_startup(self) -> None:
+        """
+        Añade los tiempos de arranque al fichero config.STARTUP_LOG (CSV), si se ha 
+        configurado:
+            - init: hasta crear el controlador y la ventana (importaciones incluidas)
+            - window: hasta que la ventana se muestra
+            - loaded: hasta que se han cargado todos los registros
         """
-        Comprueba si el registro contiene valores válidos
+        if not config.STARTUP_LOG or 'logged' in self.timings:
+            return
+        self.timings['logged'] = True
+
+        import csv
+
+        new_file = not os.path.exists(config.STARTUP_LOG)
+        with open(config.STARTUP_LOG, 'a', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            if new_file:
+                writer.writerow(['date', 'backend', 'rows', 'init', 'window', 'loaded'])
+            writer.writerow([
+                time.strftime('%Y-%m-%d %H:%M:%S'), config.BACKEND, self.view.row_count,
+                *(f"{self.timings[key]:.4f}" for key in ('init', 'window', 'loaded'))
+            ])
 
-        Retorna False si:
-            - el nombre es vacío o None
-            - el nombre contiene números
-            - el nombre tiene menos de 3 caracteres
-            - el número es vacío o None
-            - el número contiene letras
-            - el número no contiene exactamente 9 dígitos
+
+    def _init_status(self) -> None:
         """
-        # Si el input_name está vacío
-        if len(record.name) == 0:
-            self.print("Debe introducir un nombre")
-            return False
+        Consulta el número de registros y el rango de IDs a la base de datos y actualiza
+        la barra de estado. A partir de aquí se mantiene de forma incremental.
+        """
+        service = RecordGetter(self.repo)
+        self.total = service.count_records()
+        self.first_id, self.last_id = service.get_id_range()
+        self._show_status()
 
-        # Si el input_name contiene números. Eliminamos espacios con split y join.
-        if not "".join(record.name.split()).isalpha():
-            self.print("El nombre debe estar compuesto por los caracteres [a-z, A-Z] y espacios")
-            return False
 
-        # Si el input_name tiene menos de 3 caracteres
-        if len(record.name) < 3:
-            self.print("El nombre debe contener al menos 3 caracteres")
-            return False
+    def _show_status(self) -> None:
+        """
+        Muestra el estado actual en la barra de estado de la vista.
+        """
+        self.view.set_status(self.total, self.first_id, self.last_id)
 
-        # Si el input_number está vacío
-        if len(record.number) == 0:
-            self.print("Debe introducir un número de teléfono móvil (6xx xxx xxx)")
-            return False
 
-        # Si el input_number no es convertible a número
-        if not record.number.isnumeric():
-            self.print("El número debe estar compuesto solamente por dígitos")
-            return False
+    def _status_added(self, id : int) -> None:
+        """
+        Actualiza el estado tras insertar el registro 'id', sin consultar la base de datos.
+        """
+        self.total += 1
+        self.first_id = id if self.first_id is None else min(self.first_id, id)
+        self.last_id = id if self.last_id is None else max(self.last_id, id)
+        self._show_status()
+
+
+    def _status_removed(self, id : int) -> None:
+        """
+        Actualiza el estado tras eliminar el registro 'id'. Solo se consulta de nuevo el 
+        rango de IDs si se ha eliminado uno de sus extremos.
+        """
+        self.total -= 1
+        if id in (self.first_id, self.last_id):
+            self.first_id, self.last_id = RecordGetter(self.repo).get_id_range()
+        self._show_status()
+
 
-        # Si el input_number no tiene 9 dígitos
-        if len(record.number) != 9:
-            self.print("El número debe contener exactamente 9 dígitos")
+    def run(self):
+        """
+        Lanza la aplicación.
+        """
+        if self.maintenance.files:
+            self.maintenance.start()
+        self.view.mainloop()
+
+
+    def exit(self):
+        """
+        Libera el motor de almacenamiento y cierra la interfaz gráfica.
+        """
+        self.maintenance.stop()
+        self.repo.close()
+        self.view.exit()
+
+
+    def is_valid_record(self, record : Record) -> bool:
+        """
+        Comprueba si el registro contiene valores válidos (ver Record.validate). Si no,
+        muestra el motivo al usuario.
+        """
+        error = record.validate()
+
+        if error:
+            self.print(error)
             return False
 
         return True 
@@ -144,6 +263,7 @@ class Controller():
         if id > 0:
             record.id = id
             self.view.add_record(record.__dict__)
+            self._status_added(id)
             # self.print ("Nuevo regsitro insertado: ", record)
         else:
             self.print ("La inserción falló")
@@ -195,6 +315,105 @@ class Controller():
         self.print ("Registro actualizado: ", record)
 
 
+    def update_many(self, records : list) -> int:
+        """
+        Actualiza varios registros en una única transacción y refresca la interfaz gráfica
+        en una sola pasada.
+
+        Parámetros:
+            - records (list de Record): registros a actualizar.
+
+        Retorna:
+            - Número de registros actualizados.
+        """
+        # Crear servicio
+        service = RecordUpdater(self.repo)
+
+        # Lanzar acción. Actualizar
+        count = service.update_records(records)
+
+        # Actualizar front
+        if count:
+            self.view.update_records(record.__dict__ for record in records)
+
+        return count
+
+
+    def update_where(self, predicate : callable, transform : callable) -> int:
+        """
+        Actualiza los registros que cumplan 'predicate' aplicándoles 'transform', en una
+        única transacción (una por shard con el motor 'sharded'), y refresca la interfaz
+        gráfica en una sola pasada.
+
+        Parámetros:
+            - predicate (callable): recibe un Record y devuelve True si hay que actualizarlo.
+            - transform (callable): recibe un Record y devuelve el Record actualizado.
+
+        Retorna:
+            - Número de registros actualizados.
+        """
+        # Guardar los registros transformados para actualizar la vista
+        updated = []
+
+        def collect(record : Record) -> Record:
+            record = transform(record)
+            updated.append(record)
+            return record
+
+        from model.repository.sharded_repo import PartialUpdateError
+
+        # Crear servicio
+        service = RecordUpdater(self.repo)
+
+        # Lanzar acción. Actualizar. Con shards, la actualización puede aplicarse solo en
+        # parte: no refrescar los registros que no se han actualizado
+        try:
+            count = service.update_records_where(predicate, collect)
+        except PartialUpdateError as e:
+            self.print(str(e))
+            rolled_back = set(e.rolled_back)
+            updated = [record for record in updated if record.id not in rolled_back]
+            count = e.updated
+
+        # Actualizar front
+        if count:
+            self.view.update_records(record.__dict__ for record in updated)
+
+        return count
+
+
+    def change_prefix(self) -> None:
+        """
+        Sustituye un prefijo de los números de teléfono por otro de la misma longitud en
+        todos los registros (por ejemplo, tras un cambio de prefijo del operador).
+        """
+        from tkinter.simpledialog import askstring
+
+        old = askstring("Change prefix", "Prefijo actual:")
+        if not old:
+            return
+        new = askstring("Change prefix", "Nuevo prefijo:")
+        if not new:
+            return
+
+        # Comprobar los prefijos para que los números sigan siendo válidos
+        if not (old.isnumeric() and new.isnumeric()) or len(old) != len(new):
+            self.print("Los prefijos deben ser numéricos y de la misma longitud")
+            return
+
+        def predicate(record : Record) -> bool:
+            return str(record.number).startswith(old)
+
+        def transform(record : Record) -> Record:
+            record.number = new + str(record.number)[len(old):]
+            return record
+
+        # Lanzar acción
+        count = self.update_where(predicate, transform)
+
+        self.print("Registros actualizados: ", count)
+
+
     def remove(self) -> None:
         """
         Elimina el registro seleccionado. Actualiza la interfaz.
@@ -219,7 +438,8 @@ class Controller():
 
         # Actualizar front
         self.view.remove_one()
-        
+        self._status_removed(int(id))
+
         self.print("Registro eliminado: ", record)
 
 
@@ -227,19 +447,17 @@ class Controller():
         """
         Elimina todos los registros de la base de datos. Actualiza la interfaz gráfica.
         """
-        # Recupear datos desde la base de datos
-        rows = self.get_all()
-
         # Crear servicio
         service = RecordDeleter(self.repo)
 
-        # Lanzar acción para cada fila. Eliminar
-        for id, name, number in rows:
-            record = Record(id, name, number)
-            service.delete_record(record)
+        # Lanzar acción. Eliminar todos con una única consulta
+        service.delete_all_records()
 
-        # Actualizar front
+        # Actualizar front, cancelando la carga inicial si no ha terminado
+        self.loader = None
         self.view.remove_all()
+        self.total, self.first_id, self.last_id = 0, None, None
+        self._show_status()
 
         self.print("Todos los registros han sido eliminados")
 
@@ -248,36 +466,80 @@ class Controller():
         """
         Abre y lee un fichero CSV. Pide al usuario que seleccione un fichero CSV para leer.
         Se pasan los datos a la interfaz gráfica.
+
+        La importación se confirma por lotes: si se interrumpe, al volver a importar el 
+        mismo fichero se continúa tras el último lote confirmado, sin duplicar registros.
         """
-        filename = askopenfilename(filetypes=[('CSV', '.csv')])
+        from tkinter.filedialog import askopenfilename
+        from model.services.record_importer import RecordImporter, FileChangedError
+
+        filename = self._dialog(askopenfilename, filetypes=[('CSV', '.csv')])
 
         if not filename:
             return
 
-        with open(filename) as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                # Recuperar columnas
-                try:
-                    name = row['NOMBRE']
-                    number = row['TELEFONO']
-                except KeyError:
-                    # Error en las cabeceras
-                    msg = "Las cabeceras del fichero CSV deben ser NOMBRE, TELEFONO"
-                    showinfo(title="Formato no válido", message=msg)
-                    return
+        # Crear servicio
+        service = RecordImporter(self.repo)
+
+        # Si el fichero ha cambiado desde la última importación, o ya se importó completo,
+        # preguntar antes de importarlo otra vez desde el principio
+        state = service.get_state(filename)
+        restart = False
+        if state and (service.has_changed(filename, state) or state['done']):
+            if service.has_changed(filename, state):
+                msg = (f"El fichero ha cambiado desde la última importación ({state['inserted']} "
+                       "registros insertados). No se puede continuar donde se quedó. "
+                       "¿Importarlo desde el principio? Los registros ya importados pueden duplicarse.")
+            else:
+                msg = "Este fichero ya se ha importado. ¿Importarlo de nuevo?"
+            if not self._dialog(askyesno, title="Importar de nuevo", message=msg):
+                return
+            restart = True
+
+        # Lanzar acción. Importar
+        try:
+            report = service.import_csv(filename, config.IMPORT_BATCH_SIZE, self._add_imported,
+                                        restart=restart)
+        except FileChangedError as e:
+            # El fichero ha cambiado mientras se preguntaba
+            self._dialog(showinfo, title="Fichero modificado", message=str(e))
+            return
+        except ValueError as e:
+            # Error en las cabeceras
+            self._dialog(showinfo, title="Formato no válido", message=str(e))
+            return
+        except OSError as e:
+            self._dialog(showinfo, title="Error de lectura", message=str(e))
+            return
+
+        # Mostrar el informe de la importación
+        self._dialog(showinfo, title="Importación completada", message=service.format_report(report))
+
+
+    def _add_imported(self, records : list) -> None:
+        """
+        Añade a la interfaz gráfica un lote de registros importados.
+        """
+        self.view.add_records(record.__dict__ for record in records)
 
-                # Encapsular datos
-                record = Record(name=name, number=number)
+        # Actualizar la barra de estado una vez por lote. Con shards, los IDs del lote no
+        # siguen el orden de las filas
+        first, last = min(record.id for record in records), max(record.id for record in records)
+        self.total += len(records)
+        self.first_id = first if self.first_id is None else min(self.first_id, first)
+        self.last_id = last if self.last_id is None else max(self.last_id, last)
+        self._show_status()
 
-                # Insertar en la base de datos y en la vista
-                self.insert(record)
+        # Refrescar la ventana durante importaciones largas
+        self.view.update_idletasks()
 
 
     def write_csv(self) -> None:
         """
         Escribe los registros de la base de datos en un fichero.
         """
+        import csv
+
         # Archivo de salida
         filename = 'output.csv'
         # 
@@ -305,12 +567,172 @@ class Controller():
         csvfile.close()
 
         # Mostrar ventana de confirmación
-        showinfo(title="Operación completada", message="Los datos se han exportado correctamente")
+        self._dialog(showinfo, title="Operación completada", message="Los datos se han exportado correctamente")
+
+
+    def write_delta_csv(self) -> None:
+        """
+        Exporta a un fichero CSV solo los cambios (altas, modificaciones y bajas) 
+        registrados desde la última exportación delta. El coste es proporcional al número
+        de cambios, no al tamaño de la tabla.
+
+        El fichero se llama 'delta_<fecha>_<hora>.csv' (el número de secuencia no sirve: en
+        algunos motores no es consecutivo). Las columnas 'seq' indican el rango exportado.
+        El punto de control solo avanza si el fichero se escribe completo.
+        """
+        import csv
+
+        consumer = 'delta-csv'
+        fieldnames = ['seq', 'op', 'id', 'name', 'number', 'date']
+
+        # Crear servicio
+        service = RecordTracker(self.repo)
+
+        # Recuperar el punto de control y los cambios posteriores
+        checkpoint = service.get_checkpoint(consumer)
+        changes = service.get_changes_since(checkpoint)
+
+        # Comprobar si hay cambios antes de crear el fichero
+        first = next(changes, None)
+        if first is None:
+            self._dialog(showinfo, title="Operación completada", message="No hay cambios que exportar")
+            return
+
+        # Nombre del fichero, sin sobrescribir una exportación del mismo segundo
+        stamp = time.strftime('%Y%m%d_%H%M%S')
+        filename = f'delta_{stamp}.csv'
+        suffix = 1
+        while os.path.exists(filename):
+            suffix += 1
+            filename = f'delta_{stamp}_{suffix}.csv'
+
+        # Escribir en un fichero temporal y renombrarlo al terminar
+        tmp_filename = filename + '.tmp'
+        last_seq = checkpoint
+        try:
+            with open(tmp_filename, 'w', newline='') as csvfile:
+                writer = csv.writer(csvfile)
+                # Escribir cabeceras
+                writer.writerow(fieldnames)
+
+                # Guardar cambios
+                for change in itertools.chain([first], changes):
+                    writer.writerow(change)
+                    last_seq = change[0]
+
+            os.replace(tmp_filename, filename)
+        except OSError as e:
+            self._dialog(showinfo, title="Error de escritura", message=str(e))
+            return
+
+        # Avanzar el punto de control
+        service.set_checkpoint(consumer, last_seq)
+
+        # Mostrar ventana de confirmación
+        msg = f"Cambios exportados correctamente a {filename}"
+        self._dialog(showinfo, title="Operación completada", message=msg)
+
+
+    def find_duplicates(self) -> None:
+        """
+        Busca contactos con nombres casi iguales (mayúsculas, tildes, espacios, erratas) y
+        ofrece fusionarlos, conservando en cada grupo el registro de menor ID. Los 
+        duplicados con otro teléfono pueden ser personas distintas: se pregunta por ellos 
+        aparte. Los registros eliminados se guardan en config.DEDUPE_ARCHIVE.
+        """
+        from model.dedupe.engine import DedupeEngine
+
+        engine = DedupeEngine(self.repo, threshold=config.DEDUPE_THRESHOLD,
+                              archive=config.DEDUPE_ARCHIVE)
+
+        try:
+            clusters = engine.find_duplicates()
+
+            if not clusters:
+                self.print("No se han encontrado duplicados")
+                return
+
+            # Registros que se eliminarían: con el mismo teléfono, y además con otro
+            same = sum(len(engine.merge_plan(cluster)) for cluster in clusters)
+            different = sum(len(engine.merge_plan(cluster, different_numbers=True))
+                            for cluster in clusters) - same
+
+            # Preguntar antes de fusionar, primero por los que tienen el mismo teléfono
+            msg = engine.format_clusters(clusters)
+            msg += (f"\n\nDuplicados con el mismo teléfono: {same}"
+                    f"\nDuplicados con otro teléfono: {different}")
+            merge_same = same > 0 and self._dialog(askyesno,
+                title="Duplicados",
+                message=msg + f"\n\n¿Eliminar los {same} duplicados con el mismo teléfono?")
+
+            merge_different = different > 0 and self._dialog(askyesno,
+                title="Duplicados con otro teléfono",
+                message=f"{different} posibles duplicados tienen otro teléfono y pueden ser "
+                        "personas distintas con nombres parecidos. ¿Eliminarlos también? Sus "
+                        f"teléfonos se guardan en {engine.archive}.")
+
+            if not merge_same and not merge_different:
+                return
+
+            removed = []
+            for cluster in clusters:
+                removed.extend(engine.merge(cluster, same_numbers=merge_same,
+                                            different_numbers=merge_different))
+        finally:
+            engine.close()
+
+        # Actualizar front
+        self.view.remove_records(removed)
+        self._init_status()
+
+        self.print("Registros eliminados: ", len(removed))
+
+
+    def run_maintenance(self) -> None:
+        """
+        Lanza una pasada de mantenimiento de la base de datos en segundo plano y muestra
+        el informe cuando termina, sin bloquear la interfaz gráfica.
+        """
+        if not self.maintenance.is_alive():
+            self.print("El motor de almacenamiento actual no necesita mantenimiento")
+            return
+
+        # El informe llega desde el hilo de mantenimiento; se recoge en el hilo de Tk
+        self.maintenance.request(self.maintenance_reports.put)
+        self.view.after(200, self._show_maintenance_report)
+
+
+    def _show_maintenance_report(self) -> None:
+        """
+        Muestra el informe de mantenimiento si ya está disponible, si no vuelve a 
+        comprobarlo más tarde.
+        """
+        try:
+            report = self.maintenance_reports.get_nowait()
+        except queue.Empty:
+            self.view.after(200, self._show_maintenance_report)
+            return
+
+        from model.maintenance.tasks import format_report
+
+        self._dialog(showinfo, title="Mantenimiento completado", message=format_report(report))
+
+
+    def _dialog(self, dialog : callable, **kwargs):
+        """
+        Muestra un diálogo modal (showinfo, askyesno, askopenfilename...) y devuelve su 
+        resultado. En el modo de perfilado, la medición se pausa mientras el diálogo espera 
+        al usuario, para que el informe recoja solo el trabajo de la acción.
+        """
+        if self.profiler:
+            with self.profiler.paused():
+                return dialog(**kwargs)
+        return dialog(**kwargs)
+
 
-    
     def print(self, text : str, args = ""):
         msg = text + str(args)
-        showinfo(message=msg)
+        self._dialog(showinfo, message=msg)
     
 
 if __name__ == '__main__':
@@ -1,3 +1,14 @@
 from model import data
 from model import repository
-from model import services
\ No newline at end of file
+from model import services
+from model import maintenance
+from model import sql
+import importlib
+
+# Subpaquetes que solo usan algunas opciones del menú: se importan al acceder a ellos
+LAZY_SUBMODULES = ['dedupe']
+
+def __getattr__(name):
+    if name in LAZY_SUBMODULES:
+        return importlib.import_module(f'{__name__}.{name}')
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
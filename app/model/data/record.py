@@ -8,4 +8,44 @@ class Record:
 
     def __str__(self):
         return str(self.__dict__)
-        # return f"({self.id}, {self.name}, {self.number})"
\ No newline at end of file
+        # return f"({self.id}, {self.name}, {self.number})"
+
+    def validate(self) -> str:
+        """
+        Comprueba si el registro contiene valores válidos
+
+        Retorna un mensaje de error si:
+            - el nombre es vacío o None
+            - el nombre contiene números
+            - el nombre tiene menos de 3 caracteres
+            - el número es vacío o None
+            - el número contiene letras
+            - el número no contiene exactamente 9 dígitos
+
+        Retorna una cadena vacía si el registro es válido.
+        """
+        # Si el nombre está vacío
+        if not self.name:
+            return "Debe introducir un nombre"
+
+        # Si el nombre contiene números. Eliminamos espacios con split y join.
+        if not "".join(self.name.split()).isalpha():
+            return "El nombre debe estar compuesto por los caracteres [a-z, A-Z] y espacios"
+
+        # Si el nombre tiene menos de 3 caracteres
+        if len(self.name) < 3:
+            return "El nombre debe contener al menos 3 caracteres"
+
+        # Si el número está vacío
+        if not self.number:
+            return "Debe introducir un número de teléfono móvil (6xx xxx xxx)"
+
+        # Si el número no es convertible a número
+        if not str(self.number).isnumeric():
+            return "El número debe estar compuesto solamente por dígitos"
+
+        # Si el número no tiene 9 dígitos
+        if len(str(self.number)) != 9:
+            return "El número debe contener exactamente 9 dígitos"
+
+        return ""
@@ -0,0 +1 @@
+from . import keys, engine
\ No newline at end of file
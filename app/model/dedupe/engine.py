@@ -0,0 +1,254 @@
+"""
+ - Fichero: engine.py
+ - Descripción: Detección y fusión de contactos duplicados
+ - Autor: Alejandro Ruiz Becerra
+"""
+from ..data.record import Record
+from ..repository.storage_backend import StorageBackend
+from .keys import normalize, blocking_keys, similarity
+from datetime import datetime
+from itertools import groupby
+import csv, os, sqlite3, tempfile
+
+
+class DedupeEngine:
+    """
+    Busca contactos con nombres casi iguales sin comparar todos con todos (O(n²)).
+
+    1. build_index() recorre la agenda por bloques y guarda en una tabla índice, en disco,
+       las claves de bloqueo de cada nombre normalizado.
+    2. find_clusters() lee el índice ordenado por clave y solo compara los nombres que
+       comparten clave. Los pares similares se agrupan (union-find) en clusters.
+
+    La memoria usada depende del tamaño de los bloques y del número de duplicados, no del
+    tamaño de la agenda.
+
+    La similitud solo tiene en cuenta el nombre, así que un cluster puede juntar personas
+    distintas con nombres parecidos ('Maria Lopez' / 'Mario Lopez'). Por eso merge() no
+    elimina sin revisión los registros con otro teléfono, y guarda en un fichero de
+    archivo todos los registros que elimina.
+    """
+
+    # Columnas del fichero de archivo de registros eliminados
+    ARCHIVE_FIELDS = ['id', 'name', 'number', 'kept_id', 'date']
+
+    def __init__(self, repository: StorageBackend, threshold: float = 0.85,
+                 chunk_size: int = 1000, max_block: int = 200, index_db: str = None,
+                 archive: str = 'dedupe_removed.csv'):
+        """
+        Inicializador
+
+        Parámetros:
+            - repository (StorageBackend): agenda a analizar.
+            - threshold (float): similitud mínima (0 a 1) para considerar duplicados.
+            - chunk_size (int): registros leídos de la agenda en cada consulta.
+            - max_block (int): bloques más grandes se descartan (claves poco selectivas).
+            - index_db (str): fichero SQLite del índice. Por defecto uno temporal que se
+              elimina al llamar a close().
+            - archive (str): fichero CSV al que se añaden los registros eliminados por
+              merge(), con el ID del registro conservado.
+        """
+        self.repo = repository
+        self.threshold = threshold
+        self.chunk_size = chunk_size
+        self.max_block = max_block
+        self.archive = archive
+
+        self.temporary = index_db is None
+        if self.temporary:
+            fd, index_db = tempfile.mkstemp(suffix='.db', prefix='dedupe_')
+            os.close(fd)
+        self.index_db = index_db
+
+        self.conn = sqlite3.connect(self.index_db)
+        self.skipped_blocks = 0
+
+
+    def close(self) -> None:
+        """
+        Cierra el índice y lo elimina si es temporal.
+        """
+        self.conn.close()
+        if self.temporary:
+            os.remove(self.index_db)
+
+
+    def build_index(self) -> int:
+        """
+        Reconstruye la tabla índice con las claves de bloqueo de todos los registros.
+
+        Retorna:
+            - Número de registros indexados.
+        """
+        self.conn.executescript("""
+            DROP TABLE IF EXISTS Blocks;
+            CREATE TABLE Blocks(block TEXT NOT NULL, id INTEGER NOT NULL,
+                                normalized TEXT NOT NULL, nombre TEXT, telefono);
+        """)
+
+        indexed = 0
+        query = "INSERT INTO Blocks VALUES (?, ?, ?, ?, ?)"
+        for chunk in self.repo.iter_chunks(self.chunk_size):
+            rows = []
+            for id, name, number in chunk:
+                normalized = normalize(name or '')
+                rows.extend((key, id, normalized, name, number) for key in blocking_keys(normalized))
+            self.conn.executemany(query, rows)
+            self.conn.commit()
+            indexed += len(chunk)
+
+        # El índice se crea al final: es más rápido que mantenerlo durante la carga
+        self.conn.execute("CREATE INDEX idx_blocks ON Blocks(block, id)")
+        self.conn.commit()
+
+        return indexed
+
+
+    def find_clusters(self) -> list:
+        """
+        Compara los registros de cada bloque y agrupa los duplicados.
+
+        Retorna:
+            - Lista de clusters, cada uno una lista de Record ordenada por ID, ordenados
+              por el ID de su primer registro.
+        """
+        parent = {}         # union-find: id -> id del representante
+        records = {}        # id -> Record, solo de los registros con duplicados
+
+        def find(id):
+            while parent[id] != id:
+                parent[id] = parent[parent[id]]
+                id = parent[id]
+            return id
+
+        def union(a, b):
+            parent.setdefault(a, a)
+            parent.setdefault(b, b)
+            root_a, root_b = find(a), find(b)
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+
+        self.skipped_blocks = 0
+        query = "SELECT block, id, normalized, nombre, telefono FROM Blocks ORDER BY block, id"
+
+        for _, rows in groupby(self.conn.execute(query), key=lambda row: row[0]):
+            block = list(rows)
+
+            if len(block) > self.max_block:
+                self.skipped_blocks += 1
+                continue
+
+            # Comparar cada par del bloque (el bloque es pequeño)
+            for i, (_, id_a, norm_a, name_a, number_a) in enumerate(block):
+                for _, id_b, norm_b, name_b, number_b in block[i + 1:]:
+                    # Si ya están en el mismo cluster no hace falta compararlos
+                    if id_a in parent and id_b in parent and find(id_a) == find(id_b):
+                        continue
+                    if norm_a == norm_b or similarity(norm_a, norm_b) >= self.threshold:
+                        union(id_a, id_b)
+                        records[id_a] = Record(id_a, name_a, number_a)
+                        records[id_b] = Record(id_b, name_b, number_b)
+
+        # Agrupar por representante
+        clusters = {}
+        for id in sorted(parent):
+            clusters.setdefault(find(id), []).append(records[id])
+
+        return [clusters[root] for root in sorted(clusters)]
+
+
+    def find_duplicates(self) -> list:
+        """
+        Construye el índice y devuelve los clusters de duplicados (ver find_clusters).
+        """
+        self.build_index()
+        return self.find_clusters()
+
+
+    def merge_plan(self, cluster: list, keep: Record = None, same_numbers: bool = True,
+                   different_numbers: bool = False) -> list:
+        """
+        Decide qué registros del cluster eliminar. Se conserva 'keep' (por defecto el de 
+        menor ID) y se eliminan solo sus duplicados directos (nombre igual o similar al 
+        suyo, no a través de otro miembro del cluster): los que tienen su mismo teléfono 
+        si same_numbers, y los que tienen otro si different_numbers. Los registros que 
+        quedan se tratan igual, conservando el de menor ID, hasta recorrer el cluster.
+
+        Retorna:
+            - Lista de pares (registro a eliminar, registro conservado).
+        """
+        remaining = sorted(cluster, key=lambda record: keep is None or record.id != keep.id)
+        plan = []
+
+        while remaining:
+            kept, *others = remaining
+            kept_name = normalize(kept.name or '')
+
+            remaining = []
+            for record in others:
+                name = normalize(record.name or '')
+                similar = name == kept_name or similarity(name, kept_name) >= self.threshold
+                same = str(record.number) == str(kept.number)
+
+                if similar and (same_numbers if same else different_numbers):
+                    plan.append((record, kept))
+                else:
+                    remaining.append(record)
+
+        return plan
+
+
+    def merge(self, cluster: list, keep: Record = None, same_numbers: bool = True,
+              different_numbers: bool = False) -> list:
+        """
+        Fusiona un cluster según merge_plan(). Los duplicados con otro teléfono 
+        (different_numbers) solo deben eliminarse después de que el usuario los revise.
+
+        Cada registro eliminado se añade antes al fichero de archivo (self.archive), de 
+        modo que sus teléfonos se pueden recuperar.
+
+        Retorna:
+            - Lista de los IDs eliminados.
+        """
+        plan = self.merge_plan(cluster, keep, same_numbers, different_numbers)
+
+        if not plan:
+            return []
+
+        self.__archive(plan)
+
+        return [record.id for record, _ in plan if self.repo.delete(record)]
+
+
+    def __archive(self, plan: list) -> None:
+        """
+        Añade los registros de 'plan' al fichero de archivo, junto con el ID del registro
+        conservado en su lugar.
+        """
+        new = not os.path.exists(self.archive)
+        date = datetime.now().isoformat(timespec='seconds')
+
+        with open(self.archive, 'a', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            if new:
+                writer.writerow(self.ARCHIVE_FIELDS)
+            writer.writerows((r.id, r.name, r.number, kept.id, date) for r, kept in plan)
+
+
+    def format_clusters(self, clusters: list, limit: int = 10) -> str:
+        """
+        Da formato de texto a los 'limit' primeros clusters. Indica también los bloques 
+        descartados por superar max_block, cuyos registros no se han comparado.
+        """
+        lines = [f"{len(clusters)} grupos de posibles duplicados"]
+
+        for cluster in clusters[:limit]:
+            lines.append(" / ".join(f"{r.name} ({r.number})" for r in cluster))
+        if len(clusters) > limit:
+            lines.append(f"... y {len(clusters) - limit} más")
+
+        if self.skipped_blocks:
+            lines.append(f"{self.skipped_blocks} bloques de más de {self.max_block} registros "
+                         f"no se han comparado (claves poco selectivas)")
+
+        return "\n".join(lines)
@@ -0,0 +1,87 @@
+"""
+ - Fichero: keys.py
+ - Descripción: Normalización de nombres y claves de bloqueo para detectar duplicados
+ - Autor: Alejandro Ruiz Becerra
+
+Dos nombres solo se comparan si comparten alguna clave de bloqueo. Las claves se eligen
+para que los casi duplicados habituales (mayúsculas, tildes, espacios, erratas, orden de
+las palabras) compartan al menos una.
+"""
+from difflib import SequenceMatcher
+import unicodedata
+
+# Longitud de las claves de prefijo y sufijo
+AFFIX_LENGTH = 4
+
+# Grupos de consonantes de Soundex
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'),
+    **dict.fromkeys('cgjkqsxz', '2'),
+    **dict.fromkeys('dt', '3'),
+    'l': '4',
+    **dict.fromkeys('mn', '5'),
+    'r': '6',
+}
+
+
+def normalize(name: str) -> str:
+    """
+    Normaliza un nombre: sin tildes ni diacríticos, en minúsculas, solo letras (el resto
+    de caracteres separa palabras) y con un único espacio entre palabras. 'José  MARÍA' -> 'jose maria'.
+    """
+    decomposed = unicodedata.normalize('NFKD', name)
+    letters = "".join(
+        c if c.isalpha() else ' '
+        for c in decomposed if not unicodedata.combining(c)
+    )
+    return " ".join(letters.lower().split())
+
+
+def soundex(word: str) -> str:
+    """
+    Código fonético Soundex de una palabra normalizada (letra inicial y tres dígitos).
+    """
+    if not word:
+        return ''
+
+    code = word[0]
+    last = SOUNDEX_CODES.get(word[0], '')
+    for c in word[1:]:
+        digit = SOUNDEX_CODES.get(c, '')
+        if digit and digit != last:
+            code += digit
+        # 'h' y 'w' no separan consonantes con el mismo código; las vocales sí
+        if c not in 'hw':
+            last = digit
+
+    return (code + '000')[:4]
+
+
+def blocking_keys(normalized: str) -> set:
+    """
+    Claves de bloqueo de un nombre normalizado:
+        - 'p:' prefijo del nombre sin espacios
+        - 's:' sufijo del nombre sin espacios (erratas al principio)
+        - 'f:' códigos Soundex de las palabras, ordenados (fonética y orden de palabras)
+    """
+    compact = normalized.replace(' ', '')
+    if not compact:
+        return set()
+
+    phonetic = "-".join(sorted(soundex(word) for word in normalized.split()))
+
+    return {
+        'p:' + compact[:AFFIX_LENGTH],
+        's:' + compact[-AFFIX_LENGTH:],
+        'f:' + phonetic,
+    }
+
+
+def similarity(a: str, b: str) -> float:
+    """
+    Similitud (0 a 1) entre dos nombres normalizados. Se toma la mayor entre comparar
+    los nombres sin espacios y comparar sus palabras ordenadas.
+    """
+    direct = SequenceMatcher(None, a.replace(' ', ''), b.replace(' ', '')).ratio()
+    ordered = SequenceMatcher(None, " ".join(sorted(a.split())), " ".join(sorted(b.split()))).ratio()
+    return max(direct, ordered)
@@ -0,0 +1 @@
+from . import tasks, scheduler
\ No newline at end of file
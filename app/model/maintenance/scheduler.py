@@ -0,0 +1,107 @@
+"""
+ - Fichero: scheduler.py
+ - Descripción: Planificador del mantenimiento de la base de datos en segundo plano
+ - Autor: Alejandro Ruiz Becerra
+"""
+from .tasks import run_maintenance
+import queue, threading, time
+
+
+class MaintenanceScheduler(threading.Thread):
+    """
+    Hilo que ejecuta el mantenimiento de las bases de datos cuando la aplicación lleva 
+    un tiempo sin actividad, como mucho una vez cada 'interval' segundos. La actividad
+    se notifica con touch(); request() fuerza una pasada inmediata.
+    """
+
+    def __init__(self, files: list, idle: float = 60, interval: float = 3600, budget: float = 0.5):
+        """
+        Inicializador
+
+        Parámetros:
+            - files (list): ficheros SQLite a mantener.
+            - idle (float): segundos sin actividad necesarios para lanzar el mantenimiento.
+            - interval (float): segundos mínimos entre dos pasadas automáticas.
+            - budget (float): tiempo máximo, en segundos, de cada tarea.
+        """
+        super().__init__(name='maintenance', daemon=True)
+        self.files = files
+        self.idle = idle
+        self.interval = interval
+        self.budget = budget
+
+        self.last_activity = time.monotonic()
+        self.last_run = time.monotonic()
+
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._requests = queue.Queue()    # callbacks de request(), desde el hilo de Tk
+
+
+    def touch(self) -> None:
+        """
+        Notifica actividad del usuario, lo que aplaza el siguiente mantenimiento.
+        """
+        self.last_activity = time.monotonic()
+
+
+    def request(self, callback: callable = None) -> None:
+        """
+        Solicita una pasada de mantenimiento inmediata. 'callback' recibe el informe 
+        ({fichero: {tarea: resultado}}) y se ejecuta en el hilo de mantenimiento. Se 
+        puede llamar desde cualquier hilo.
+        """
+        self._requests.put(callback)
+        self._wakeup.set()
+
+
+    def stop(self) -> None:
+        """
+        Detiene el hilo. La tarea en curso termina dentro de su presupuesto de tiempo.
+        """
+        self._stopped = True
+        self._wakeup.set()
+
+
+    def run_pass(self) -> dict:
+        """
+        Ejecuta el mantenimiento sobre todos los ficheros.
+
+        Retorna:
+            - Un diccionario {fichero: {tarea: resultado}}.
+        """
+        report = {db: run_maintenance(db, self.budget) for db in self.files}
+        self.last_run = time.monotonic()
+        return report
+
+
+    def _due(self) -> bool:
+        """
+        Indica si toca una pasada automática.
+        """
+        now = time.monotonic()
+        return now - self.last_activity >= self.idle and now - self.last_run >= self.interval
+
+
+    def run(self) -> None:
+        """
+        Bucle del hilo: comprueba periódicamente si la aplicación está ociosa.
+        """
+        while not self._stopped:
+            self._wakeup.wait(timeout=min(self.idle, self.interval) / 2 or 1)
+            self._wakeup.clear()
+
+            if self._stopped:
+                break
+
+            if not self._requests.empty() or self._due():
+                report = self.run_pass()
+
+                # Notificar a quien haya solicitado la pasada
+                while True:
+                    try:
+                        callback = self._requests.get_nowait()
+                    except queue.Empty:
+                        break
+                    if callback:
+                        callback(report)
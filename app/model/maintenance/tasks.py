@@ -0,0 +1,172 @@
+"""
+ - Fichero: tasks.py
+ - Descripción: Tareas de mantenimiento de una base de datos SQLite
+ - Autor: Alejandro Ruiz Becerra
+
+Cada tarea dispone de un presupuesto de tiempo. Si se agota, SQLite interrumpe la 
+consulta (progress handler) y la tarea se da por aplazada, de modo que el mantenimiento
+nunca bloquea la base de datos más de ese tiempo.
+"""
+import os, sqlite3, time
+
+# Máximo de filas que examina ANALYZE por índice (estadísticas aproximadas pero baratas)
+ANALYSIS_LIMIT = 1000
+
+# Páginas liberadas en cada paso del vacuum incremental
+VACUUM_STEP = 64
+
+
+def connect(db: str, busy_timeout: float = 0.1) -> sqlite3.Connection:
+    """
+    Abre una conexión para mantenimiento. Espera como máximo 'busy_timeout' segundos a
+    que se libere un bloqueo: si la aplicación está escribiendo, el mantenimiento cede.
+    """
+    conn = sqlite3.connect(db, timeout=busy_timeout, isolation_level=None)
+    conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+    return conn
+
+
+def _with_budget(conn: sqlite3.Connection, budget: float, fn) -> str:
+    """
+    Ejecuta fn() interrumpiéndola si tarda más de 'budget' segundos.
+
+    Retorna:
+        - El mensaje de fn(), 'interrupted' si se agota el tiempo o 'busy' si la base de
+          datos está bloqueada por otra conexión.
+    """
+    deadline = time.monotonic() + budget
+    conn.set_progress_handler(lambda: time.monotonic() > deadline, 1000)
+
+    try:
+        return fn()
+    except sqlite3.OperationalError as e:
+        return 'interrupted' if 'interrupt' in str(e) else 'busy'
+    finally:
+        conn.set_progress_handler(None, 0)
+
+
+def optimize(conn: sqlite3.Connection, budget: float) -> str:
+    """
+    Actualiza las estadísticas del planificador de consultas. La primera vez ejecuta 
+    ANALYZE (limitado por ANALYSIS_LIMIT); después PRAGMA optimize, que solo analiza las
+    tablas cuyas estadísticas han quedado obsoletas.
+    """
+    def task():
+        query = "SELECT COUNT(*) FROM sqlite_master WHERE name='sqlite_stat1'"
+        if conn.execute(query).fetchone()[0] == 0:
+            conn.execute("ANALYZE")
+            return 'analyzed'
+
+        conn.execute("PRAGMA optimize")
+        return 'ok'
+
+    return _with_budget(conn, budget, task)
+
+
+def incremental_vacuum(conn: sqlite3.Connection, budget: float) -> str:
+    """
+    Devuelve al sistema las páginas libres del fichero, VACUUM_STEP páginas cada vez, 
+    hasta que no queden o se agote el tiempo. Cada paso es una transacción corta.
+
+    Requiere 'PRAGMA auto_vacuum = INCREMENTAL', que solo tienen las bases de datos 
+    creadas con el esquema actual. Las anteriores necesitan una conversión, una sola vez
+    (ver enable_incremental_vacuum).
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return 'disabled (python app maintenance --enable-incremental-vacuum)'
+
+    deadline = time.monotonic() + budget
+    initial = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    freed = 0
+
+    def task():
+        nonlocal freed
+        while time.monotonic() < deadline:
+            free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            freed = initial - free_pages
+            if free_pages == 0:
+                break
+            # executescript ejecuta el PRAGMA hasta el final (execute libera una sola página)
+            conn.executescript(f"PRAGMA incremental_vacuum({VACUUM_STEP});")
+        return f'{freed} pages freed'
+
+    result = _with_budget(conn, budget, task)
+    if result in ('interrupted', 'busy'):
+        result = f'{freed} pages freed ({result})'
+    return result
+
+
+def quick_check(conn: sqlite3.Connection, budget: float) -> str:
+    """
+    Comprueba la integridad de la base de datos con PRAGMA quick_check (sin verificar
+    el contenido de los índices, mucho más rápido que integrity_check).
+    """
+    def task():
+        rows = conn.execute("PRAGMA quick_check").fetchall()
+        return 'ok' if rows == [('ok',)] else '; '.join(row[0] for row in rows)
+
+    return _with_budget(conn, budget, task)
+
+
+def enable_incremental_vacuum(db: str, busy_timeout: float = 5.0) -> str:
+    """
+    Convierte una base de datos creada sin 'auto_vacuum = INCREMENTAL' (anterior al 
+    esquema actual). El modo solo se puede cambiar con un VACUUM completo, que reescribe 
+    el fichero entero: necesita acceso exclusivo y espacio libre en disco igual al tamaño 
+    de la base de datos, y no tiene presupuesto de tiempo. Se lanza a mano, una sola vez.
+
+    Parámetros:
+        - db (str): fichero de la base de datos.
+        - busy_timeout (float): segundos de espera si otra conexión la está usando.
+
+    Retorna:
+        - El resultado: 'already enabled', 'busy' o el tamaño antes y después.
+    """
+    conn = sqlite3.connect(db, timeout=busy_timeout, isolation_level=None)
+
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return 'already enabled'
+
+        before = os.path.getsize(db)
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        return f'enabled ({before} -> {os.path.getsize(db)} bytes)'
+    except sqlite3.OperationalError:
+        return 'busy'
+    finally:
+        conn.close()
+
+
+# Tareas en orden de ejecución
+TASKS = [optimize, incremental_vacuum, quick_check]
+
+
+def run_maintenance(db: str, budget: float = 0.5) -> dict:
+    """
+    Ejecuta todas las tareas de mantenimiento sobre la base de datos 'db'.
+
+    Parámetros:
+        - db (str): fichero de la base de datos.
+        - budget (float): tiempo máximo, en segundos, de cada tarea.
+
+    Retorna:
+        - Un diccionario {tarea: resultado}.
+    """
+    conn = connect(db)
+
+    try:
+        return {task.__name__: task(conn, budget) for task in TASKS}
+    finally:
+        conn.close()
+
+
+def format_report(report: dict) -> str:
+    """
+    Da formato de texto a un informe {fichero: {tarea: resultado}}.
+    """
+    lines = []
+    for db, results in report.items():
+        lines.append(db)
+        lines.extend(f"  - {task}: {result}" for task, result in results.items())
+    return "\n".join(lines)
@@ -1 +1 @@
-from . import record_repo
\ No newline at end of file
+from . import storage_backend, record_repo, memory_repo, sharded_repo, factory
\ No newline at end of file
@@ -0,0 +1,33 @@
+from .storage_backend import StorageBackend
+from .record_repo import RecordRepository
+from .memory_repo import MemoryRepository
+from .sharded_repo import ShardedRepository
+
+# Motores disponibles, por nombre
+BACKENDS = ['sqlite', 'sqlite-memory', 'memory', 'sharded']
+
+def create_repository(backend: str = 'sqlite', db: str = 'v2.db', snapshot: str = None,
+                      shards: int = 4) -> StorageBackend:
+    """
+    Crea el motor de almacenamiento indicado.
+
+    Parámetros:
+        - backend (str): 'sqlite' (fichero 'db'), 'sqlite-memory' (SQLite ':memory:'),
+          'memory' (diccionario en memoria) o 'sharded' (varios ficheros SQLite).
+        - db (str): fichero de la base de datos SQLite (nombre base en 'sharded').
+        - snapshot (str): fichero de snapshot del motor 'memory' (opcional).
+        - shards (int): número de shards de las bases de datos 'sharded' nuevas.
+
+    Retorna:
+        - El motor de almacenamiento.
+    """
+    if backend == 'sqlite':
+        return RecordRepository(db)
+    if backend == 'sqlite-memory':
+        return RecordRepository(':memory:')
+    if backend == 'memory':
+        return MemoryRepository(snapshot)
+    if backend == 'sharded':
+        return ShardedRepository(db, shards)
+
+    raise ValueError(f"Motor de almacenamiento desconocido: '{backend}'. Opciones: {BACKENDS}")
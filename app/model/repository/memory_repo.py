@@ -0,0 +1,250 @@
+from ..data.record import Record
+from .storage_backend import StorageBackend
+from collections import Counter
+from datetime import datetime, timezone
+import json, os
+
+class MemoryRepository(StorageBackend):
+    """
+    Motor de almacenamiento en memoria, sin SQL. Los registros se guardan en un 
+    diccionario indexado por ID; como los IDs son crecientes, el orden de inserción del 
+    diccionario coincide con el orden por ID.
+
+    Si se indica un fichero 'snapshot', el estado se carga de él al iniciar y se vuelca
+    a disco al llamar a snapshot() o close().
+    """
+
+    def __init__(self, snapshot: str = None) -> None:
+        """
+        Inicializa el objeto.
+
+        Parámetros:
+            - snapshot (str): fichero JSON donde persistir el estado (opcional).
+        """
+        self.snapshot_file = snapshot
+
+        self.records = {}           # id -> (nombre, telefono)
+        self.next_id = 1
+        self.changes = []           # (seq, op, id, nombre, telefono, fecha); seq = índice + 1
+        self.checkpoints = {}       # consumidor -> seq
+        self.imports = {}           # fichero -> estado de la importación
+
+        if snapshot and os.path.exists(snapshot):
+            self.__load()
+
+
+    def __load(self) -> None:
+        """
+        Carga el estado desde el fichero de snapshot.
+        """
+        with open(self.snapshot_file) as json_file:
+            state = json.load(json_file)
+
+        self.records = {int(id): tuple(row) for id, row in state['records']}
+        self.next_id = state['next_id']
+        self.changes = [tuple(change) for change in state['changes']]
+        self.checkpoints = state['checkpoints']
+        self.imports = state.get('imports', {})
+
+
+    def snapshot(self) -> None:
+        """
+        Vuelca el estado al fichero de snapshot. Se escribe en un fichero temporal que
+        después se renombra, de modo que un fallo a mitad no corrompe el snapshot anterior.
+        """
+        if not self.snapshot_file:
+            return
+
+        state = {
+            'records': [[id, row] for id, row in self.records.items()],
+            'next_id': self.next_id,
+            'changes': self.changes,
+            'checkpoints': self.checkpoints,
+            'imports': self.imports,
+        }
+
+        tmp_file = self.snapshot_file + '.tmp'
+        with open(tmp_file, 'w') as json_file:
+            json.dump(state, json_file)
+        os.replace(tmp_file, self.snapshot_file)
+
+
+    def close(self) -> None:
+        """
+        Vuelca el estado a disco si hay fichero de snapshot.
+        """
+        self.snapshot()
+
+
+    def __log(self, op: str, id: int, row: tuple) -> None:
+        """
+        Añade una entrada al registro de cambios (equivale a los triggers de SQLite).
+        """
+        seq = len(self.changes) + 1
+        date = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        self.changes.append((seq, op, id, row[0], row[1], date))
+
+
+    @staticmethod
+    def __number(number):
+        """
+        Convierte el teléfono a entero si es numérico, igual que la afinidad INTEGER de
+        la columna 'telefono' en SQLite.
+        """
+        return int(number) if str(number).isdigit() else number
+
+
+    #############################################
+    #
+    # Métodos CRUD (Create, Read, Update, Delete)
+    #
+    #############################################
+
+    def insert(self, record: Record) -> int:
+        id = self.next_id
+        self.next_id += 1
+
+        row = (record.name, self.__number(record.number))
+        self.records[id] = row
+        self.__log('I', id, row)
+
+        return id
+
+
+    def get_all(self) -> list:
+        return [(id, *row) for id, row in self.records.items()]
+
+
+    def iter_chunks(self, size: int = 1000):
+        ids = list(self.records)
+        for i in range(0, len(ids), size):
+            chunk = ((id, self.records.get(id)) for id in ids[i:i + size])
+            yield [(id, *row) for id, row in chunk if row is not None]
+
+
+    def search(self, term: str) -> list:
+        term = term.lower()
+        return [
+            (id, name, number) for id, (name, number) in self.records.items()
+            if term in name.lower() or str(number).startswith(term)
+        ]
+
+
+    def update(self, record: Record) -> bool:
+        id = int(record.id)
+        if id not in self.records:
+            return False
+
+        row = (record.name, self.__number(record.number))
+        self.records[id] = row
+        self.__log('U', id, row)
+
+        return True
+
+
+    def delete(self, record: Record) -> bool:
+        id = int(record.id)
+        row = self.records.pop(id, None)
+        if row is None:
+            return False
+
+        self.__log('D', id, row)
+
+        return True
+
+
+    def delete_all(self) -> int:
+        count = len(self.records)
+        for id, row in self.records.items():
+            self.__log('D', id, row)
+        self.records.clear()
+
+        return count
+
+
+    #############################################
+    #
+    # Actualizaciones por lotes
+    #
+    #############################################
+
+    def update_many(self, records: list) -> int:
+        return sum(self.update(record) for record in records)
+
+
+    def update_where(self, predicate: callable, transform: callable) -> int:
+        # Calcular todos los cambios antes de aplicarlos, como en una transacción
+        updated = [
+            transform(record)
+            for record in (Record(id, *row) for id, row in self.records.items())
+            if predicate(record)
+        ]
+        return self.update_many(updated)
+
+
+    #############################################
+    #
+    # Consultas de agregación
+    #
+    #############################################
+
+    def count(self) -> int:
+        return len(self.records)
+
+
+    def count_by_prefix(self, n: int) -> list:
+        counter = Counter(str(number)[:n] for _, number in self.records.values())
+        return sorted(counter.items())
+
+
+    def id_range(self) -> tuple:
+        if not self.records:
+            return (None, None)
+        return (next(iter(self.records)), next(reversed(self.records)))
+
+
+    #############################################
+    #
+    # Registro de cambios (sincronización delta)
+    #
+    #############################################
+
+    def changes_since(self, seq: int = 0):
+        # seq es el índice de la primera entrada pendiente
+        for i in range(max(seq, 0), len(self.changes)):
+            yield self.changes[i]
+
+
+    def get_checkpoint(self, consumer: str) -> int:
+        return self.checkpoints.get(consumer, 0)
+
+
+    def set_checkpoint(self, consumer: str, seq: int) -> None:
+        self.checkpoints[consumer] = seq
+
+
+    #############################################
+    #
+    # Importaciones reanudables
+    #
+    #############################################
+
+    def get_import_state(self, filename: str) -> dict:
+        state = self.imports.get(filename)
+        return dict(state) if state else None
+
+
+    def import_batch(self, filename: str, records: list, state: dict) -> list:
+        # El lote ya está confirmado
+        current = self.imports.get(filename)
+        if current and current['batch'] >= state['batch']:
+            return []
+
+        ids = [self.insert(record) for record in records]
+        self.imports[filename] = dict(state)
+
+        return ids
+
+
+    def clear_import_state(self, filename: str) -> None:
+        self.imports.pop(filename, None)
@@ -1,8 +1,27 @@
 from ..data.record import Record
+from ..sql.migrations import SCHEMA_VERSION
+from .storage_backend import StorageBackend
 import sqlite3, os
 
-class RecordRepository:
-    
+class RecordRepository(StorageBackend):
+    """
+    Motor de almacenamiento SQLite. Cada operación abre y cierra su propia conexión, de
+    modo que un mismo objeto puede usarse desde varios hilos (ShardedRepository).
+
+    Con db=':memory:' la base de datos vive en memoria y se mantiene una única conexión
+    abierta durante toda la vida del objeto (cada conexión a ':memory:' crea una base de
+    datos nueva y vacía); en ese caso, el objeto solo puede usarse desde su hilo.
+    """
+
+    # Script SQL de la tabla Agenda en su última versión (SCHEMA_VERSION)
+    AGENDA_SCHEMA_FILE = 'create_table_agenda.sql'
+
+    # Scripts SQL que definen el esquema, en orden de ejecución
+    SCHEMA_FILES = [
+        'create_table_agenda.sql',
+        'create_table_changes.sql',
+        'create_table_import_state.sql',
+    ]
 
     def __init__(self, db: str) -> None:
         """
@@ -12,66 +31,96 @@ class RecordRepository:
             - db (string): nombre de la base de datos.
         """
         self.db = db
+        self.in_memory = (db == ':memory:')
+
+        # Conexión persistente, solo en memoria
+        self.conn = sqlite3.connect(db) if self.in_memory else None
 
         # Crear la tabla Agenda
-        self.__connect()
-        self.__create_table()
-        self.__close()
+        conn = self.__connect()
+        self.__create_table(conn)
+        self.__close(conn)
 
 
-    def __connect(self) -> None:
+    def __connect(self) -> sqlite3.Connection:
         """
-        Conecta a la base de datos y crea la tabla AGENDA si no existe.
+        Devuelve una conexión nueva con la base de datos. En memoria se devuelve la 
+        conexión persistente.
         """
-        self.conn = sqlite3.connect(self.db)
+        return self.conn if self.in_memory else sqlite3.connect(self.db)
 
 
-    def __create_table(self) -> None:
+    def __create_table(self, conn: sqlite3.Connection) -> None:
         """
-        Crea la tabla Agenda.
+        Crea la tabla Agenda y las tablas y triggers del registro de cambios.
+
+        Las bases de datos nuevas se crean con la última versión del esquema. En las 
+        existentes con una versión anterior no se toca la tabla Agenda: se actualiza con
+        las migraciones (model.sql.migrator), que se lanzan aparte por ser largas.
         """
         dirname = os.path.dirname(__file__)
-        filename = os.path.join(dirname, '../sql/create_table_agenda.sql')
 
-        with open(filename) as sql_file:
-            query = sql_file.read()
-            self.conn.cursor().execute(query)
+        # Comprobar si la base de datos es nueva
+        query = "SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name='Agenda'"
+        fresh = conn.execute(query).fetchone()[0] == 0
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+
+        for schema_file in self.SCHEMA_FILES:
+            if schema_file == self.AGENDA_SCHEMA_FILE and not fresh and version < SCHEMA_VERSION:
+                continue
 
+            filename = os.path.join(dirname, '../sql', schema_file)
 
-    def __close(self) -> None:
+            with open(filename) as sql_file:
+                conn.executescript(sql_file.read())
+
+        # Marcar la versión del esquema en las bases de datos nuevas
+        if fresh:
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+    @staticmethod
+    def stored_number(number):
         """
-        Cierra la conexión con la base de datos.
+        Convierte el teléfono a entero si es numérico, para que la columna 'telefono'
+        almacene siempre enteros. Devuelve el valor que se guarda en la tabla.
         """
-        self.conn.commit()
-        self.conn.close()
+        return int(number) if str(number).isdigit() else number
 
 
-    def __execute(self, query: str) -> list:
+    def __close(self, conn: sqlite3.Connection) -> None:
+        """
+        Confirma los cambios y cierra la conexión 'conn'. En memoria solo confirma los 
+        cambios.
+        """
+        conn.commit()
+        if not self.in_memory:
+            conn.close()
+
+
+    def __execute(self, query: str, params: tuple = ()) -> list:
         """
         Ejecuta la consulta 'query'
 
         Parámetros:
             - query (str): consulta a ejecutar
+            - params (tuple): valores para los parámetros '?' de la consulta
         Retorna:
             - Una lista con los resultados de la consulta. Esta lista puede estar vacía.
             - None si se ha producido un error.
         """
         # Conectar a la base de datos
-        self.__connect()
+        conn = self.__connect()
 
         # Ejecutar consulta
         try:
-            results = self.conn.cursor().execute(query).fetchall()
+            results = conn.cursor().execute(query, params).fetchall()
         except sqlite3.IntegrityError as e:
             print(e)
             results = [None]
 
-        # Recuperar último ID
-        query = "SELECT last_insert_rowid()"
-        self.last_id = self.conn.cursor().execute(query).fetchone()[0]
-
         # Cerrar la conexión
-        self.__close()
+        self.__close(conn)
 
         # for row in results:
         #     print(row)
@@ -79,6 +128,34 @@ class RecordRepository:
         return results
 
 
+    def __execute_many(self, query: str, params_seq) -> int:
+        """
+        Ejecuta la consulta 'query' una vez por cada tupla de parámetros de 'params_seq',
+        con executemany y en una única transacción.
+
+        Parámetros:
+            - query (str): consulta a ejecutar
+            - params_seq (iterable): tuplas de valores para los parámetros '?'
+        Retorna:
+            - Número de filas afectadas. 0 si se ha producido un error (no se aplica nada).
+        """
+        # Conectar a la base de datos
+        conn = self.__connect()
+
+        # Ejecutar consulta. Si falla, se deshace la transacción completa
+        try:
+            affected = conn.cursor().executemany(query, params_seq).rowcount
+        except sqlite3.IntegrityError as e:
+            print(e)
+            conn.rollback()
+            affected = 0
+
+        # Cerrar la conexión
+        self.__close(conn)
+
+        return affected
+
+
     #############################################
     #
     # Métodos CRUD (Create, Read, Update, Delete)
@@ -96,12 +173,22 @@ class RecordRepository:
         Retorna:
             - ID del nuevo registro insertado (empieza en 1, 0 no hay datos).
         """
-        # Insertar valores
-        query = f"INSERT INTO Agenda VALUES ('{record.name}', '{record.number}')"
-        self.__execute(query)
+        # Conectar a la base de datos
+        conn = self.__connect()
+
+        # Insertar valores y recuperar el ID con la misma conexión
+        query = "INSERT INTO Agenda(nombre, telefono) VALUES (?, ?)"
+        try:
+            last_id = conn.execute(query, (record.name, self.stored_number(record.number))).lastrowid
+        except sqlite3.IntegrityError as e:
+            print(e)
+            last_id = 0
+
+        # Cerrar la conexión
+        self.__close(conn)
 
         # Devolver ID del registro insertado
-        return self.last_id
+        return last_id
 
 
     def get_all(self) -> list:
@@ -115,6 +202,48 @@ class RecordRepository:
         return self.__execute(query)
 
 
+    def iter_chunks(self, size: int = 1000):
+        """
+        Recorre la tabla 'Agenda' por bloques de 'size' tuplas, en orden de ID. Cada 
+        bloque es una consulta corta (paginación por clave: rowid > último ID leído), de 
+        modo que nunca se carga la tabla entera ni se mantiene abierta una lectura larga.
+
+        Parámetros:
+            - size (int): número de tuplas por bloque.
+
+        Retorna:
+            - Listas de tuplas (id, nombre, telefono).
+        """
+        query = "SELECT rowid, nombre, telefono FROM Agenda WHERE rowid > ? ORDER BY rowid LIMIT ?"
+        last_id = 0
+
+        while True:
+            rows = self.__execute(query, (last_id, size))
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1][0]
+
+
+    def search(self, term: str) -> list:
+        """
+        Busca por nombre o por prefijo del teléfono.
+
+        Parámetros:
+            - term (str): texto contenido en el nombre (sin distinguir mayúsculas) o 
+              prefijo del teléfono.
+
+        Retorna:
+            - Una lista de tuplas (id, nombre, telefono), ordenada por ID.
+        """
+        query = """
+            SELECT rowid, nombre, telefono FROM Agenda
+            WHERE nombre LIKE ? OR CAST(telefono AS TEXT) LIKE ?
+            ORDER BY rowid
+        """
+        return self.__execute(query, (f"%{term}%", f"{term}%"))
+
+
     def update(self, record : Record) -> bool:
         """
         Actualiza el nombre de la tupla (nombre, telefono) que cumpla la condición
@@ -128,9 +257,9 @@ class RecordRepository:
             - True si la consulta se ha ejecutado correctamente, False en otro caso.
         """   
         # Consulta 
-        query = f"UPDATE Agenda SET nombre='{record.name}', telefono={record.number} WHERE rowid={record.id}"
+        query = "UPDATE Agenda SET nombre=?, telefono=? WHERE rowid=?"
         # Lanzar consulta y guardar resultados
-        success = self.__execute(query)
+        success = self.__execute(query, (record.name, self.stored_number(record.number), record.id))
         # Devolver True si la lista es vacía (no ha habido errores)
         return len(success) == 0
 
@@ -146,8 +275,295 @@ class RecordRepository:
             - True si la consulta se ha ejecutado correctamente, False en otro caso.
         """
         # Eliminar valores
-        query = f"DELETE FROM Agenda WHERE rowid='{record.id}'"
+        query = "DELETE FROM Agenda WHERE rowid=?"
         # Lanzar consulta y guardar resultados
-        success = self.__execute(query)
+        success = self.__execute(query, (record.id,))
         # Devolver True si la lista es vacía (no ha habido errores)
         return len(success) == 0
+
+
+    def delete_all(self) -> int:
+        """
+        Elimina todas las tuplas de la tabla 'Agenda' con una única consulta.
+
+        Retorna:
+            - Número de registros eliminados.
+        """
+        count = self.count()
+        self.__execute("DELETE FROM Agenda")
+        return count
+
+
+    #############################################
+    #
+    # Actualizaciones por lotes
+    #
+    #############################################
+
+    def update_many(self, records: list) -> int:
+        """
+        Actualiza el nombre y el teléfono de varios registros en una única transacción.
+
+        Parámetros:
+            - records (iterable de Record): registros a actualizar, identificados por id.
+
+        Retorna:
+            - Número de filas afectadas.
+        """
+        query = "UPDATE Agenda SET nombre=?, telefono=? WHERE rowid=?"
+        params = ((record.name, self.stored_number(record.number), record.id) for record in records)
+        return self.__execute_many(query, params)
+
+
+    def update_where(self, predicate: callable, transform: callable) -> int:
+        """
+        Actualiza los registros que cumplan 'predicate', sustituyéndolos por el resultado
+        de 'transform'. La lectura y la escritura se hacen en la misma transacción, que 
+        toma el bloqueo de escritura antes de leer (BEGIN IMMEDIATE): ningún otro proceso
+        puede modificar la tabla entre la lectura y la escritura.
+
+        Parámetros:
+            - predicate (callable): recibe un Record y devuelve True si hay que actualizarlo.
+            - transform (callable): recibe un Record y devuelve el Record actualizado.
+
+        Retorna:
+            - Número de filas afectadas.
+        """
+        # Conectar a la base de datos y abrir la transacción antes de leer. Sin esto, 
+        # sqlite3 solo la abre con el primer UPDATE
+        conn = self.__connect()
+        conn.execute("BEGIN IMMEDIATE")
+
+        try:
+            # Recorrer la tabla con el cursor, guardando solo los registros que cambian
+            query = "SELECT rowid, nombre, telefono FROM Agenda"
+            params = []
+            for row in conn.execute(query):
+                record = Record(*row)
+                if predicate(record):
+                    record = transform(record)
+                    params.append((record.name, self.stored_number(record.number), row[0]))
+
+            # Ejecutar consulta. Si falla, se deshace la transacción completa
+            query = "UPDATE Agenda SET nombre=?, telefono=? WHERE rowid=?"
+            affected = conn.executemany(query, params).rowcount
+        except sqlite3.IntegrityError as e:
+            print(e)
+            conn.rollback()
+            affected = 0
+        except Exception:
+            # Error en 'predicate' o 'transform': liberar el bloqueo antes de propagarlo
+            conn.rollback()
+            self.__close(conn)
+            raise
+
+        # Cerrar la conexión
+        self.__close(conn)
+
+        return affected
+
+
+    #############################################
+    #
+    # Consultas de agregación
+    #
+    #############################################
+
+    def count(self) -> int:
+        """
+        Devuelve el número de tuplas de la tabla 'Agenda', sin recuperarlas.
+        """
+        query = "SELECT COUNT(*) FROM Agenda"
+        return self.__execute(query)[0][0]
+
+
+    def count_by_prefix(self, n: int) -> list:
+        """
+        Cuenta los registros agrupados por los 'n' primeros dígitos del teléfono.
+
+        Parámetros:
+            - n (int): longitud del prefijo.
+
+        Retorna:
+            - Una lista de tuplas (prefijo, número de registros), ordenada por prefijo.
+        """
+        query = """
+            SELECT substr(telefono, 1, ?) AS prefijo, COUNT(*) FROM Agenda
+            GROUP BY prefijo ORDER BY prefijo
+        """
+        return self.__execute(query, (n,))
+
+
+    def id_range(self) -> tuple:
+        """
+        Devuelve los IDs mínimo y máximo de la tabla 'Agenda'. Ambas consultas se 
+        resuelven sobre el índice del rowid, sin recorrer la tabla.
+
+        Retorna:
+            - Una tupla (min, max), (None, None) si la tabla está vacía.
+        """
+        query = "SELECT (SELECT MIN(rowid) FROM Agenda), (SELECT MAX(rowid) FROM Agenda)"
+        return self.__execute(query)[0]
+
+
+    #############################################
+    #
+    # Registro de cambios (sincronización delta)
+    #
+    #############################################
+
+    def changes_since(self, seq: int = 0):
+        """
+        Recorre los cambios registrados con número de secuencia mayor que 'seq', en orden
+        de secuencia. Es un generador: las filas se leen del cursor a medida que se
+        consumen, sin cargar el registro completo en memoria.
+
+        Parámetros:
+            - seq (int): último número de secuencia ya procesado.
+
+        Retorna:
+            - Tuplas (seq, op, id, nombre, telefono, fecha), donde op es 'I', 'U' o 'D'.
+        """
+        # Conexión propia: el generador puede vivir más que cualquier otra consulta
+        conn = self.__connect()
+
+        try:
+            query = """
+                SELECT seq, op, record_id, nombre, telefono, fecha
+                FROM AgendaChanges WHERE seq > ? ORDER BY seq
+            """
+            yield from conn.execute(query, (seq,))
+        finally:
+            if not self.in_memory:
+                conn.close()
+
+
+    def get_checkpoint(self, consumer: str) -> int:
+        """
+        Devuelve el último número de secuencia procesado por el consumidor 'consumer'.
+
+        Parámetros:
+            - consumer (str): nombre del consumidor (por ejemplo, 'delta-csv').
+
+        Retorna:
+            - El número de secuencia guardado, 0 si el consumidor no tiene ninguno.
+        """
+        query = "SELECT seq FROM ChangesCheckpoint WHERE consumer=?"
+        results = self.__execute(query, (consumer,))
+        return results[0][0] if results else 0
+
+
+    def set_checkpoint(self, consumer: str, seq: int) -> None:
+        """
+        Guarda 'seq' como último número de secuencia procesado por 'consumer'.
+
+        Parámetros:
+            - consumer (str): nombre del consumidor.
+            - seq (int): número de secuencia a guardar.
+        """
+        query = "INSERT OR REPLACE INTO ChangesCheckpoint VALUES (?, ?)"
+        self.__execute(query, (consumer, seq))
+
+
+    #############################################
+    #
+    # Importaciones reanudables
+    #
+    #############################################
+
+    IMPORT_STATE_FIELDS = ['size', 'offset', 'batch', 'rows', 'inserted', 'rejected', 'done']
+
+    # Huella del fichero, en la tabla ImportCheck
+    IMPORT_CHECK_FIELDS = ['mtime', 'digest']
+
+    def get_import_state(self, filename: str) -> dict:
+        """
+        Devuelve el estado de la importación del fichero 'filename'.
+
+        Retorna:
+            - Un diccionario con las claves de IMPORT_STATE_FIELDS e IMPORT_CHECK_FIELDS
+              (None si no se guardaron), None si no hay estado.
+        """
+        fields = self.IMPORT_STATE_FIELDS + self.IMPORT_CHECK_FIELDS
+        query = f"""
+            SELECT {", ".join(fields)} FROM ImportState
+            LEFT JOIN ImportCheck USING (filename) WHERE filename=?
+        """
+        results = self.__execute(query, (filename,))
+        return dict(zip(fields, results[0])) if results else None
+
+
+    def import_batch(self, filename: str, records: list, state: dict) -> list:
+        """
+        Inserta un lote de registros importados y guarda el nuevo estado de la importación
+        en la misma transacción: o se confirman los dos o ninguno.
+
+        Si el lote ya se había confirmado (state['batch'] no es mayor que el guardado) no
+        se inserta nada, de modo que repetir un lote nunca duplica registros.
+
+        Parámetros:
+            - filename (str): ruta absoluta del fichero importado.
+            - records (list de Record): registros válidos del lote.
+            - state (dict): estado tras el lote, con las claves de IMPORT_STATE_FIELDS.
+
+        Retorna:
+            - Lista de los IDs asignados, en el orden de 'records'.
+        """
+        # Conectar a la base de datos
+        conn = self.__connect()
+
+        try:
+            # Comprobar que el lote no está ya confirmado
+            query = "SELECT batch FROM ImportState WHERE filename=?"
+            row = conn.execute(query, (filename,)).fetchone()
+            if row and row[0] >= state['batch']:
+                return []
+
+            # Insertar los registros
+            ids = []
+            query = "INSERT INTO Agenda(nombre, telefono) VALUES (?, ?)"
+            for record in records:
+                params = (record.name, self.stored_number(record.number))
+                ids.append(conn.execute(query, params).lastrowid)
+
+            # Guardar el estado
+            fields = ", ".join(self.IMPORT_STATE_FIELDS)
+            marks = ", ".join("?" for _ in self.IMPORT_STATE_FIELDS)
+            query = f"INSERT OR REPLACE INTO ImportState(filename, {fields}) VALUES (?, {marks})"
+            values = [state[field] for field in self.IMPORT_STATE_FIELDS]
+            conn.execute(query, (filename, *values))
+
+            query = "INSERT OR REPLACE INTO ImportCheck(filename, mtime, digest) VALUES (?, ?, ?)"
+            conn.execute(query, (filename, state.get('mtime'), state.get('digest')))
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        finally:
+            # Cerrar la conexión (confirma la transacción si no se ha deshecho)
+            self.__close(conn)
+
+        return ids
+
+
+    def clear_import_state(self, filename: str) -> None:
+        """
+        Elimina el estado de la importación del fichero 'filename'.
+        """
+        self.__execute("DELETE FROM ImportState WHERE filename=?", (filename,))
+        self.__execute("DELETE FROM ImportCheck WHERE filename=?", (filename,))
+
+
+    def database_files(self) -> list:
+        """
+        Devuelve el fichero de la base de datos (ninguno si está en memoria).
+        """
+        return [] if self.in_memory else [self.db]
+
+
+    def close(self) -> None:
+        """
+        Cierra la conexión persistente de las bases de datos en memoria.
+        """
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
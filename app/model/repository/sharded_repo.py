@@ -0,0 +1,600 @@
+from ..data.record import Record
+from .storage_backend import StorageBackend
+from .record_repo import RecordRepository
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+import glob, heapq, json, os, sqlite3, zlib
+
+
+class PartialUpdateError(sqlite3.IntegrityError):
+    """
+    Una actualización por lotes (update_where) ha fallado en algunos shards y se ha 
+    confirmado en los demás: cada shard actualiza su parte en su propia transacción.
+
+    Atributos:
+        - updated (int): filas actualizadas en los shards que han confirmado.
+        - failed (list): shards que han deshecho su parte.
+        - rolled_back (list): IDs globales de los registros que no se han actualizado.
+    """
+
+    def __init__(self, updated: int, failed: list, rolled_back: list):
+        super().__init__(f"La actualización ha fallado en {len(failed)} shard(s) "
+                         f"({len(rolled_back)} registros sin actualizar). Los {updated} "
+                         "registros de los demás shards sí se han actualizado.")
+        self.updated = updated
+        self.failed = failed
+        self.rolled_back = rolled_back
+
+
+class ShardedRepository(StorageBackend):
+    """
+    Motor de almacenamiento repartido en N ficheros SQLite (shards). Cada registro se 
+    guarda en el shard que corresponde al hash de su teléfono en el momento de crearlo.
+
+    Los IDs son globales: id = id_local * N + shard, de modo que las operaciones sobre un
+    registro concreto van directamente a su shard. Un registro no cambia de shard si se
+    modifica su teléfono (su ID no cambia); rebalance() los redistribuye.
+
+    Las consultas sobre toda la agenda (get_all, search, count...) se lanzan en paralelo
+    en todos los shards y se combinan sus resultados, ordenados por ID.
+
+    El número de shards se guarda en el fichero '<base>.shards.json'. El registro de 
+    cambios combinado, con su propia secuencia, se guarda en el shard 0.
+
+    Los IDs globales no siguen el orden de inserción entre shards: el de menor ID no es
+    necesariamente el registro más antiguo.
+    """
+
+    def __init__(self, db: str, shards: int = 4) -> None:
+        """
+        Inicializa el objeto.
+
+        Parámetros:
+            - db (str): nombre base de la base de datos ('v2.db' -> 'v2.shard0.db', ...).
+            - shards (int): número de shards si la base de datos es nueva. Si ya existe,
+              se usa el número guardado.
+        """
+        self.db = db
+        self.base = os.path.splitext(db)[0]
+        self.manifest = self.base + '.shards.json'
+        self.pending = self.base + '.rebalance.json'
+
+        # Terminar o deshacer un rebalanceo interrumpido
+        self.__recover()
+
+        # Número de shards: el guardado o el indicado si es nueva
+        if os.path.exists(self.manifest):
+            with open(self.manifest) as json_file:
+                shards = json.load(json_file)['shards']
+        else:
+            self.__write_manifest(self.manifest, shards)
+
+        self.n = shards
+        self.shards = [RecordRepository(self.shard_file(self.base, k)) for k in range(shards)]
+        self.executor = ThreadPoolExecutor(max_workers=shards, thread_name_prefix='shard')
+        self.__create_changes_table()
+
+
+    @staticmethod
+    def shard_file(base: str, k: int) -> str:
+        """
+        Devuelve el fichero del shard 'k'.
+        """
+        return f"{base}.shard{k}.db"
+
+
+    @staticmethod
+    def __write_manifest(manifest: str, shards: int, **extra) -> None:
+        """
+        Guarda el número de shards (y los datos de 'extra'). Se escribe en un fichero 
+        temporal que sustituye al anterior, de modo que nunca queda a medias.
+        """
+        tmp_manifest = manifest + '.tmp'
+        with open(tmp_manifest, 'w') as json_file:
+            json.dump({'shards': shards, **extra}, json_file)
+        os.replace(tmp_manifest, manifest)
+
+
+    #############################################
+    #
+    # Reparto de registros e IDs
+    #
+    #############################################
+
+    @staticmethod
+    def route(number, shards: int) -> int:
+        """
+        Devuelve el shard que corresponde al teléfono 'number' entre 'shards' shards. Se 
+        usa el valor que guarda la tabla (RecordRepository.stored_number), de modo que 
+        '0612345678' y 612345678 van al mismo shard.
+        """
+        return zlib.crc32(str(RecordRepository.stored_number(number)).encode()) % shards
+
+
+    def __global(self, local_id: int, k: int) -> int:
+        """
+        Convierte el ID local del shard 'k' en ID global.
+        """
+        return local_id * self.n + k
+
+
+    def __local(self, record: Record) -> tuple:
+        """
+        Devuelve (shard, copia de 'record' con su ID local).
+        """
+        id = int(record.id)
+        return id % self.n, Record(id // self.n, record.name, record.number)
+
+
+    def __rows(self, rows: list, k: int) -> list:
+        """
+        Convierte a IDs globales las tuplas (id, nombre, telefono) del shard 'k'.
+        """
+        return [(self.__global(id, k), *rest) for id, *rest in rows]
+
+
+    def __fan_out(self, fn) -> list:
+        """
+        Ejecuta fn(k, shard) en paralelo en todos los shards y devuelve sus resultados.
+
+        Si falla algún shard, se espera a que terminen todos antes de relanzar la primera
+        excepción (en orden de shard): ninguna operación sigue en curso cuando el 
+        llamador recibe el error.
+        """
+        futures = [self.executor.submit(fn, k, shard) for k, shard in enumerate(self.shards)]
+        wait(futures)
+        return [future.result() for future in futures]
+
+
+    def __merge(self, results: list) -> list:
+        """
+        Combina las listas de tuplas de cada shard (ya con ID global y ordenadas), en 
+        orden de ID.
+        """
+        return list(heapq.merge(*results, key=lambda row: row[0]))
+
+
+    #############################################
+    #
+    # Métodos CRUD (Create, Read, Update, Delete)
+    #
+    #############################################
+
+    def insert(self, record: Record) -> int:
+        k = self.route(record.number, self.n)
+        local_id = self.shards[k].insert(record)
+        return self.__global(local_id, k) if local_id > 0 else 0
+
+
+    def get_all(self) -> list:
+        return self.__merge(self.__fan_out(lambda k, shard: self.__rows(shard.get_all(), k)))
+
+
+    def __stream(self, k: int, shard: RecordRepository, size: int):
+        """
+        Recorre las filas del shard 'k' con su ID global. Es un método (y no una expresión
+        generadora dentro de un bucle) para que cada generador tenga su propio 'k'.
+        """
+        for chunk in shard.iter_chunks(size):
+            yield from self.__rows(chunk, k)
+
+
+    def iter_chunks(self, size: int = 1000):
+        """
+        Recorre los registros de todos los shards en orden de ID global. A diferencia de
+        las consultas sobre toda la agenda, no es paralelo: las páginas de cada shard se 
+        leen en el hilo del llamador a medida que las pide la mezcla.
+        """
+        streams = [self.__stream(k, shard, size) for k, shard in enumerate(self.shards)]
+
+        chunk = []
+        for row in heapq.merge(*streams, key=lambda row: row[0]):
+            chunk.append(row)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+    def search(self, term: str) -> list:
+        return self.__merge(self.__fan_out(lambda k, shard: self.__rows(shard.search(term), k)))
+
+
+    def update(self, record: Record) -> bool:
+        k, local = self.__local(record)
+        return self.shards[k].update(local)
+
+
+    def delete(self, record: Record) -> bool:
+        k, local = self.__local(record)
+        return self.shards[k].delete(local)
+
+
+    def delete_all(self) -> int:
+        return sum(self.__fan_out(lambda k, shard: shard.delete_all()))
+
+
+    #############################################
+    #
+    # Actualizaciones por lotes
+    #
+    #############################################
+
+    def update_many(self, records: list) -> int:
+        # Agrupar por shard; cada shard actualiza su parte en una transacción
+        groups = [[] for _ in self.shards]
+        for record in records:
+            k, local = self.__local(record)
+            groups[k].append(local)
+
+        return sum(self.__fan_out(lambda k, shard: shard.update_many(groups[k])))
+
+
+    def update_where(self, predicate: callable, transform: callable) -> int:
+        """
+        Cada shard actualiza su parte en paralelo y en su propia transacción, de modo que
+        no es atómico entre shards: si un shard deshace la suya (por ejemplo, un teléfono
+        que incumple el CHECK), los demás ya han confirmado. En ese caso se lanza
+        PartialUpdateError con las filas actualizadas y los shards y registros afectados.
+        Si fallan todos, no se aplica nada y devuelve 0, como RecordRepository.
+        """
+        def update_shard(k, shard):
+            # 'predicate' y 'transform' reciben los registros con su ID global
+            def to_global(record):
+                record.id = self.__global(record.id, k)
+                return record
+
+            # Registros transformados, para distinguir un fallo de "ningún registro"
+            transformed = []
+
+            def track(record):
+                transformed.append(record.id)
+                return transform(record)
+
+            affected = shard.update_where(lambda record: predicate(to_global(record)), track)
+            return affected, [] if affected else transformed
+
+        results = self.__fan_out(update_shard)
+        updated = sum(affected for affected, _ in results)
+        failed = [k for k, (_, rolled_back) in enumerate(results) if rolled_back]
+
+        if failed and updated:
+            rolled_back = [id for _, ids in results for id in ids]
+            raise PartialUpdateError(updated, failed, rolled_back)
+
+        return updated
+
+
+    #############################################
+    #
+    # Consultas de agregación
+    #
+    #############################################
+
+    def count(self) -> int:
+        return sum(self.__fan_out(lambda k, shard: shard.count()))
+
+
+    def count_by_prefix(self, n: int) -> list:
+        counter = Counter()
+        for results in self.__fan_out(lambda k, shard: shard.count_by_prefix(n)):
+            counter.update(dict(results))
+        return sorted(counter.items())
+
+
+    def id_range(self) -> tuple:
+        ranges = [
+            (self.__global(first, k), self.__global(last, k))
+            for k, (first, last) in enumerate(self.__fan_out(lambda k, shard: shard.id_range()))
+            if first is not None
+        ]
+        if not ranges:
+            return (None, None)
+        return (min(first for first, _ in ranges), max(last for _, last in ranges))
+
+
+    #############################################
+    #
+    # Registro de cambios (sincronización delta)
+    #
+    #############################################
+
+    # Script SQL del registro de cambios combinado (en el shard 0)
+    CHANGES_SCHEMA_FILE = 'create_table_sharded_changes.sql'
+
+    # Cambios leídos por consulta en changes_since
+    CHANGES_CHUNK_SIZE = 1000
+
+    def __create_changes_table(self) -> None:
+        """
+        Crea en el shard 0 las tablas del registro de cambios combinado.
+        """
+        filename = os.path.join(os.path.dirname(__file__), '../sql', self.CHANGES_SCHEMA_FILE)
+        conn = sqlite3.connect(self.shards[0].db)
+        try:
+            with open(filename) as sql_file:
+                conn.executescript(sql_file.read())
+        finally:
+            conn.close()
+
+
+    def __changes(self, k: int, changes):
+        """
+        Convierte los cambios 'changes' del shard 'k' (tuplas de changes_since) en tuplas
+        con su ID global, ordenables por fecha.
+        """
+        for local_seq, op, id, name, number, date in changes:
+            yield (date, k, local_seq, op, self.__global(id, k), name, number)
+
+
+    def __collect_changes(self) -> None:
+        """
+        Copia al registro combinado (tabla ShardedChanges del shard 0) los cambios de 
+        cada shard que aún no están en él, en orden de fecha. Se hace en una transacción
+        que toma el bloqueo de escritura antes de leer, de modo que dos llamadas a la vez 
+        no copian el mismo cambio dos veces.
+        """
+        conn = sqlite3.connect(self.shards[0].db)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+
+            # Último cambio copiado de cada shard
+            query = "SELECT COALESCE(MAX(shard_seq), 0) FROM ShardedChanges WHERE shard=?"
+            seqs = [conn.execute(query, (k,)).fetchone()[0] for k in range(self.n)]
+
+            # Los cambios del shard 0 se leen con esta misma conexión: otra conexión de
+            # lectura sobre el mismo fichero impediría confirmar la transacción
+            query = """
+                SELECT seq, op, record_id, nombre, telefono, fecha
+                FROM AgendaChanges WHERE seq > ? ORDER BY seq
+            """
+            streams = [self.__changes(0, conn.execute(query, (seqs[0],)))]
+            streams += [self.__changes(k, self.shards[k].changes_since(seqs[k])) for k in range(1, self.n)]
+
+            query = """
+                INSERT INTO ShardedChanges(shard, shard_seq, op, record_id, nombre, telefono, fecha)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """
+            conn.executemany(query, (
+                (k, local_seq, op, id, name, number, date)
+                for date, k, local_seq, op, id, name, number in heapq.merge(*streams)
+            ))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+    def changes_since(self, seq: int = 0):
+        """
+        Cambios de todos los shards posteriores a 'seq', en orden de secuencia global.
+
+        Antes de leer, los cambios nuevos de cada shard se copian al registro combinado 
+        del shard 0 (ver __collect_changes), donde reciben un número de secuencia global
+        consecutivo. Los números son estables: sirven como punto de control tras cerrar
+        la aplicación o desde otro consumidor.
+        """
+        self.__collect_changes()
+
+        # Lectura por bloques (paginación por clave): entre un bloque y otro no queda 
+        # ninguna lectura abierta que impida copiar cambios nuevos al registro combinado
+        query = """
+            SELECT seq, op, record_id, nombre, telefono, fecha
+            FROM ShardedChanges WHERE seq > ? ORDER BY seq LIMIT ?
+        """
+        while True:
+            conn = sqlite3.connect(self.shards[0].db)
+            try:
+                rows = conn.execute(query, (seq, self.CHANGES_CHUNK_SIZE)).fetchall()
+            finally:
+                conn.close()
+
+            if not rows:
+                return
+            yield from rows
+            seq = rows[-1][0]
+
+
+    def get_checkpoint(self, consumer: str) -> int:
+        conn = sqlite3.connect(self.shards[0].db)
+        try:
+            query = "SELECT seq FROM ShardedCheckpoint WHERE consumer=?"
+            row = conn.execute(query, (consumer,)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else 0
+
+
+    def set_checkpoint(self, consumer: str, seq: int) -> None:
+        conn = sqlite3.connect(self.shards[0].db)
+        try:
+            conn.execute("INSERT OR REPLACE INTO ShardedCheckpoint VALUES (?, ?)", (consumer, seq))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+    #############################################
+    #
+    # Importaciones reanudables
+    #
+    #############################################
+
+    def get_import_state(self, filename: str) -> dict:
+        """
+        Cada shard guarda su propio estado. Se devuelve el del shard más atrasado: al 
+        reanudar, los shards que ya tenían un lote lo ignoran (ver import_batch).
+        """
+        states = [shard.get_import_state(filename) for shard in self.shards]
+        known = [state for state in states if state is not None]
+
+        if not known:
+            return None
+
+        # Algún shard no llegó a confirmar el primer lote: empezar desde el principio
+        if len(known) < len(states):
+            return dict(known[0], offset=0, batch=0, rows=0, inserted=0, rejected=0, done=0,
+                        digest=None)
+
+        return min(states, key=lambda state: state['batch'])
+
+
+    def import_batch(self, filename: str, records: list, state: dict) -> list:
+        """
+        Reparte el lote entre los shards. Cada shard inserta su parte y guarda el estado
+        en su propia transacción (todos los shards guardan el estado, aunque no reciban 
+        registros). Devuelve los IDs en el orden de 'records'; 0 para los registros de 
+        shards que ya tenían el lote confirmado.
+        """
+        groups = [[] for _ in self.shards]
+        positions = [[] for _ in self.shards]
+        for i, record in enumerate(records):
+            k = self.route(record.number, self.n)
+            groups[k].append(record)
+            positions[k].append(i)
+
+        results = self.__fan_out(lambda k, shard: shard.import_batch(filename, groups[k], state))
+
+        ids = [0] * len(records)
+        for k, local_ids in enumerate(results):
+            for i, local_id in zip(positions[k], local_ids):
+                ids[i] = self.__global(local_id, k)
+
+        return ids
+
+
+    def clear_import_state(self, filename: str) -> None:
+        self.__fan_out(lambda k, shard: shard.clear_import_state(filename))
+
+
+    #############################################
+    #
+    # Rebalanceo
+    #
+    #############################################
+
+    def rebalance(self, shards: int, chunk_size: int = 1000, progress: callable = None) -> int:
+        """
+        Redistribuye todos los registros entre 'shards' shards, según el hash actual de 
+        su teléfono. Es una operación sin conexión: la aplicación no debe estar abierta.
+        La copia es secuencial (lee con iter_chunks y escribe un shard tras otro).
+
+        Los IDs de todos los registros cambian y el registro de cambios empieza de nuevo,
+        por lo que los sistemas sincronizados necesitan una exportación completa.
+
+        Los registros se copian por bloques a ficheros nuevos ('<base>.rebalance.shardK.db')
+        y después se sustituyen los ficheros (ver __swap). Si se interrumpe, el siguiente
+        ShardedRepository sobre la misma base de datos termina o deshace el rebalanceo.
+
+        Parámetros:
+            - shards (int): nuevo número de shards.
+            - chunk_size (int): registros leídos por consulta.
+            - progress (callable): recibe el número de registros copiados tras cada bloque.
+
+        Retorna:
+            - Número de registros copiados.
+        """
+        new_base = self.base + '.rebalance'
+
+        # Crear los shards nuevos (vacíos) en ficheros temporales
+        for k in range(shards):
+            if os.path.exists(self.shard_file(new_base, k)):
+                os.remove(self.shard_file(new_base, k))
+        new_files = [RecordRepository(self.shard_file(new_base, k)).db for k in range(shards)]
+        conns = [sqlite3.connect(db) for db in new_files]
+
+        # Copiar por bloques, cada bloque repartido entre los shards nuevos
+        copied = 0
+        query = "INSERT INTO Agenda(nombre, telefono) VALUES (?, ?)"
+        try:
+            for chunk in self.iter_chunks(chunk_size):
+                groups = [[] for _ in range(shards)]
+                for _, name, number in chunk:
+                    groups[self.route(number, shards)].append((name, number))
+
+                for conn, rows in zip(conns, groups):
+                    conn.executemany(query, rows)
+                    conn.commit()
+
+                copied += len(chunk)
+                if progress:
+                    progress(copied)
+        finally:
+            for conn in conns:
+                conn.close()
+
+        # La copia está completa: a partir de aquí el rebalanceo se termina siempre
+        self.executor.shutdown()
+        self.__write_manifest(self.pending, shards, previous=self.n)
+        self.__swap(self.n, shards)
+
+        # Abrir la nueva distribución
+        self.n = shards
+        self.shards = [RecordRepository(self.shard_file(self.base, k)) for k in range(shards)]
+        self.executor = ThreadPoolExecutor(max_workers=shards, thread_name_prefix='shard')
+        self.__create_changes_table()
+
+        return copied
+
+
+    def __swap(self, previous: int, shards: int) -> None:
+        """
+        Sustituye los 'previous' shards actuales por los 'shards' shards copiados por
+        rebalance(). Cada paso se puede repetir, de modo que __recover() puede volver a 
+        llamarlo si se interrumpe:
+
+        1. Los shards actuales se renombran a '<base>.old.shardK.db'.
+        2. Los nuevos se renombran a '<base>.shardK.db'.
+        3. Se sustituye el manifiesto con el nuevo número de shards.
+        4. Se elimina el marcador '<base>.rebalance.json' y después los shards antiguos
+           (si quedan, __recover() los elimina).
+        """
+        new_base = self.base + '.rebalance'
+        old_base = self.base + '.old'
+
+        # Si ya existe el antiguo, este shard se movió (y el actual puede ser ya el nuevo)
+        for k in range(previous):
+            if os.path.exists(self.shard_file(self.base, k)) and not os.path.exists(self.shard_file(old_base, k)):
+                os.replace(self.shard_file(self.base, k), self.shard_file(old_base, k))
+
+        for k in range(shards):
+            if os.path.exists(self.shard_file(new_base, k)):
+                os.replace(self.shard_file(new_base, k), self.shard_file(self.base, k))
+
+        self.__write_manifest(self.manifest, shards)
+
+        os.remove(self.pending)
+        for k in range(previous):
+            if os.path.exists(self.shard_file(old_base, k)):
+                os.remove(self.shard_file(old_base, k))
+
+
+    def __recover(self) -> None:
+        """
+        Termina un rebalanceo interrumpido después de copiar todos los registros (existe
+        el marcador '<base>.rebalance.json'), o descarta la copia si se interrumpió antes.
+        Sin marcador, los shards antiguos que queden ya se han sustituido.
+        """
+        if os.path.exists(self.pending):
+            with open(self.pending) as json_file:
+                pending = json.load(json_file)
+            self.__swap(pending['previous'], pending['shards'])
+            return
+
+        base = glob.escape(self.base)
+        for filename in glob.glob(base + '.rebalance.shard*.db') + glob.glob(base + '.old.shard*.db'):
+            os.remove(filename)
+
+
+    #############################################
+    #
+    # Ficheros y recursos
+    #
+    #############################################
+
+    def database_files(self) -> list:
+        return [shard.db for shard in self.shards]
+
+
+    def close(self) -> None:
+        self.executor.shutdown()
@@ -0,0 +1,170 @@
+from ..data.record import Record
+from abc import ABC, abstractmethod
+
+class StorageBackend(ABC):
+    """
+    Interfaz común de los motores de almacenamiento de la agenda. Los servicios dependen
+    solo de esta interfaz, de modo que el motor concreto se elige por configuración.
+
+    Los registros se devuelven como tuplas (id, nombre, telefono), ordenadas por id.
+    """
+
+    #############################################
+    #
+    # Métodos CRUD (Create, Read, Update, Delete)
+    #
+    #############################################
+
+    @abstractmethod
+    def insert(self, record: Record) -> int:
+        """
+        Inserta el registro y devuelve su nuevo ID (empieza en 1, 0 si falla).
+        """
+
+    @abstractmethod
+    def get_all(self) -> list:
+        """
+        Devuelve todos los registros como tuplas (id, nombre, telefono).
+        """
+
+    @abstractmethod
+    def iter_chunks(self, size: int = 1000):
+        """
+        Generador de listas de como mucho 'size' registros (id, nombre, telefono), en
+        orden de ID, sin cargar todos los registros a la vez.
+        """
+
+    @abstractmethod
+    def search(self, term: str) -> list:
+        """
+        Devuelve los registros (id, nombre, telefono) cuyo nombre contiene 'term' (sin 
+        distinguir mayúsculas) o cuyo teléfono empieza por 'term', ordenados por ID.
+        """
+
+    @abstractmethod
+    def update(self, record: Record) -> bool:
+        """
+        Actualiza el nombre y el teléfono del registro con ID record.id.
+        """
+
+    @abstractmethod
+    def delete(self, record: Record) -> bool:
+        """
+        Elimina el registro con ID record.id.
+        """
+
+    @abstractmethod
+    def delete_all(self) -> int:
+        """
+        Elimina todos los registros y devuelve cuántos se han eliminado.
+        """
+
+    #############################################
+    #
+    # Actualizaciones por lotes
+    #
+    #############################################
+
+    @abstractmethod
+    def update_many(self, records: list) -> int:
+        """
+        Actualiza varios registros en una única transacción y devuelve el número de filas
+        afectadas.
+        """
+
+    @abstractmethod
+    def update_where(self, predicate: callable, transform: callable) -> int:
+        """
+        Sustituye cada registro que cumpla predicate(record) por transform(record), en una
+        única transacción (una por shard en ShardedRepository), y devuelve el número de 
+        filas afectadas.
+        """
+
+    #############################################
+    #
+    # Consultas de agregación
+    #
+    #############################################
+
+    @abstractmethod
+    def count(self) -> int:
+        """
+        Devuelve el número de registros.
+        """
+
+    @abstractmethod
+    def count_by_prefix(self, n: int) -> list:
+        """
+        Devuelve tuplas (prefijo, número de registros) agrupando por los 'n' primeros
+        dígitos del teléfono, ordenadas por prefijo.
+        """
+
+    @abstractmethod
+    def id_range(self) -> tuple:
+        """
+        Devuelve los IDs (mínimo, máximo), (None, None) si no hay registros.
+        """
+
+    #############################################
+    #
+    # Registro de cambios (sincronización delta)
+    #
+    #############################################
+
+    @abstractmethod
+    def changes_since(self, seq: int = 0):
+        """
+        Generador de tuplas (seq, op, id, nombre, telefono, fecha) con seq > 'seq'.
+        """
+
+    @abstractmethod
+    def get_checkpoint(self, consumer: str) -> int:
+        """
+        Devuelve el último número de secuencia procesado por 'consumer' (0 si ninguno).
+        """
+
+    @abstractmethod
+    def set_checkpoint(self, consumer: str, seq: int) -> None:
+        """
+        Guarda el último número de secuencia procesado por 'consumer'.
+        """
+
+    #############################################
+    #
+    # Importaciones reanudables
+    #
+    #############################################
+
+    @abstractmethod
+    def get_import_state(self, filename: str) -> dict:
+        """
+        Devuelve el estado de la importación de 'filename' (claves size, offset, batch,
+        rows, inserted, rejected y done, y la huella del fichero: mtime y digest, None si
+        no se guardaron), None si no hay ninguno.
+        """
+
+    @abstractmethod
+    def import_batch(self, filename: str, records: list, state: dict) -> list:
+        """
+        Inserta un lote de registros y guarda el estado 'state' de la importación de forma
+        atómica. Si el lote state['batch'] ya estaba confirmado no hace nada. Devuelve los
+        IDs asignados.
+        """
+
+    @abstractmethod
+    def clear_import_state(self, filename: str) -> None:
+        """
+        Elimina el estado de la importación de 'filename'.
+        """
+
+    def database_files(self) -> list:
+        """
+        Devuelve los ficheros SQLite del motor, sobre los que se puede ejecutar el 
+        mantenimiento. Por defecto ninguno.
+        """
+        return []
+
+    def close(self) -> None:
+        """
+        Libera los recursos del motor. Por defecto no hace nada.
+        """
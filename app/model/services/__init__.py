@@ -1 +1,10 @@
-from . import record_creator, record_getter, record_updater, record_deleter
\ No newline at end of file
+from . import record_creator, record_getter, record_updater, record_deleter, record_tracker
+import importlib
+
+# Servicios que solo usan algunas opciones del menú: se importan al acceder a ellos
+LAZY_SUBMODULES = ['record_importer']
+
+def __getattr__(name):
+    if name in LAZY_SUBMODULES:
+        return importlib.import_module(f'{__name__}.{name}')
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
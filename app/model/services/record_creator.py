@@ -1,9 +1,9 @@
-from ..repository.record_repo import RecordRepository
+from ..repository.storage_backend import StorageBackend
 from ..data.record import Record
 
 class RecordCreator:
 
-    def __init__(self, repository: RecordRepository):
+    def __init__(self, repository: StorageBackend):
         self.repo = repository
 
     def insert_record(self, record : Record) -> int:
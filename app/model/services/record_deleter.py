@@ -1,10 +1,13 @@
-from ..repository.record_repo import RecordRepository
+from ..repository.storage_backend import StorageBackend
 from ..data.record import Record
 
 class RecordDeleter:
 
-    def __init__(self, repository: RecordRepository):
+    def __init__(self, repository: StorageBackend):
         self.repo = repository
 
     def delete_record(self, record: Record) -> bool:
         return self.repo.delete(record)
+
+    def delete_all_records(self) -> int:
+        return self.repo.delete_all()
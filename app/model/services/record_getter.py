@@ -1,11 +1,22 @@
-from ..repository.record_repo import RecordRepository
+from ..repository.storage_backend import StorageBackend
 from ..data.record import Record
 
 class RecordGetter:
 
-    def __init__(self, repository: RecordRepository):
+    def __init__(self, repository: StorageBackend):
         self.repo = repository
 
     def get_records(self) -> list:
         return self.repo.get_all()
-    
+
+    def count_records(self) -> int:
+        return self.repo.count()
+
+    def count_records_by_prefix(self, n: int) -> list:
+        return self.repo.count_by_prefix(n)
+
+    def get_id_range(self) -> tuple:
+        return self.repo.id_range()
+
+    def search_records(self, term: str) -> list:
+        return self.repo.search(term)
@@ -0,0 +1,291 @@
+from ..repository.storage_backend import StorageBackend
+from ..data.record import Record
+import csv, hashlib, os
+
+
+class FileChangedError(ValueError):
+    """
+    El fichero ha cambiado (tamaño, fecha o contenido ya importado) desde la importación
+    guardada: no se puede saber qué filas ya están importadas. Hay que volver a empezar de
+    forma explícita (restart).
+    """
+
+
+class RecordImporter:
+    """
+    Importa ficheros CSV (cabeceras NOMBRE y TELEFONO) por lotes. Cada lote se confirma
+    junto con la posición del fichero en la que termina, de modo que si la importación se
+    interrumpe, la siguiente llamada continúa desde el último lote confirmado.
+
+    Con cada lote se guarda también la huella del fichero (fecha de modificación y SHA-256
+    de los bytes ya importados), para no continuar si el fichero se ha modificado.
+    """
+
+    # Bytes leídos cada vez al calcular el resumen de la parte ya importada
+    HASH_BLOCK = 1 << 20
+
+    def __init__(self, repository: StorageBackend):
+        self.repo = repository
+
+    def get_state(self, filename: str) -> dict:
+        """
+        Devuelve el estado guardado de la importación de 'filename', None si no hay.
+        """
+        return self.repo.get_import_state(os.path.abspath(filename))
+
+    @classmethod
+    def has_changed(cls, filename: str, state: dict) -> bool:
+        """
+        Indica si 'filename' ha cambiado desde que se guardó 'state': otro tamaño, otra
+        fecha de modificación u otro contenido en la parte ya importada (los primeros 
+        state['offset'] bytes, que se leen para calcular su SHA-256). La fecha y el 
+        resumen solo se comparan si el estado los tiene.
+        """
+        if state['size'] != os.path.getsize(filename):
+            return True
+
+        if state.get('mtime') is not None and state['mtime'] != os.path.getmtime(filename):
+            return True
+
+        if state.get('digest') and state['offset']:
+            with open(filename, 'rb') as csvfile:
+                return cls._hash_prefix(csvfile, state['offset']).hexdigest() != state['digest']
+
+        return False
+
+    def reset(self, filename: str) -> None:
+        """
+        Olvida el estado de la importación de 'filename'; la siguiente empieza de cero.
+        """
+        self.repo.clear_import_state(os.path.abspath(filename))
+
+    def import_csv(self, filename: str, batch_size: int = 1000, on_batch: callable = None,
+                   restart: bool = False) -> dict:
+        """
+        Importa el fichero CSV 'filename', reanudando la importación anterior si quedó a
+        medias. Las filas no válidas (ver Record.validate) se descartan y se cuentan.
+
+        Si el fichero ha cambiado desde la importación guardada (ver has_changed) no se 
+        continúa (se duplicarían o perderían filas): hay que empezar de nuevo con
+        restart=True. Al empezar de nuevo, los registros de la importación anterior siguen
+        en la base de datos; el informe los indica ('previously_inserted') y no se da por
+        conciliado.
+
+        Parámetros:
+            - filename (str): fichero CSV.
+            - batch_size (int): filas leídas por lote (y por transacción).
+            - on_batch (callable): recibe la lista de Record insertados en cada lote, ya
+              con su ID.
+            - restart (bool): descartar el estado guardado y empezar desde el principio.
+
+        Retorna:
+            - Un informe (dict) con las filas leídas, insertadas y descartadas en total y
+              en esta ejecución, el lote y la posición de reanudación, los registros que
+              ya estaban insertados al reanudar y la conciliación con el número de 
+              registros de la base de datos.
+
+        Lanza:
+            - ValueError si las cabeceras del fichero no son NOMBRE, TELEFONO.
+            - FileChangedError si el fichero ha cambiado desde la importación guardada.
+        """
+        key = os.path.abspath(filename)
+        size = os.path.getsize(filename)
+
+        # Estado guardado. Si el fichero ha cambiado, solo se sigue si se pide empezar de nuevo
+        state = self.get_state(filename)
+        if state and not restart and self.has_changed(filename, state):
+            raise FileChangedError(
+                f"{filename} ha cambiado desde la última importación ({state['rows']} filas, "
+                f"{state['inserted']} registros insertados). Hay que importarlo desde el principio"
+            )
+
+        # Empezar de cero: los registros ya importados se quedan en la base de datos
+        previously_inserted = 0
+        if state is None or restart:
+            previously_inserted = state['inserted'] if state else 0
+            self.reset(filename)
+            state = dict(size=size, offset=0, batch=0, rows=0, inserted=0, rejected=0, done=0)
+        state['mtime'] = os.path.getmtime(filename)
+        resumed = dict(state)
+
+        count_before = self.repo.count()
+
+        # Registros de esta ejecución que ya se habían confirmado antes de reanudar (ver 
+        # _commit)
+        committed_before = 0
+
+        if not state['done']:
+            with open(filename, 'rb') as csvfile:
+                # Leer las cabeceras
+                header_line = csvfile.readline()
+                header = next(csv.reader([header_line.decode('utf-8-sig')]), [])
+                try:
+                    name_col = header.index('NOMBRE')
+                    number_col = header.index('TELEFONO')
+                except ValueError:
+                    raise ValueError("Las cabeceras del fichero CSV deben ser NOMBRE, TELEFONO")
+
+                # Continuar desde el último lote confirmado. El resumen de los bytes ya
+                # importados se completa con cada línea leída
+                if state['offset']:
+                    hasher = self._hash_prefix(csvfile, state['offset'])
+                else:
+                    hasher = hashlib.sha256(header_line)
+
+                batch = []
+                rows = rejected = 0
+                for row in self._rows(csvfile, hasher):
+                    rows += 1
+                    try:
+                        record = Record(name=row[name_col], number=row[number_col])
+                    except IndexError:
+                        record = None
+
+                    if record is None or record.validate():
+                        rejected += 1
+                    else:
+                        batch.append(record)
+
+                    if rows == batch_size:
+                        committed_before += self._commit(key, batch, state, csvfile.tell(),
+                                                         hasher.hexdigest(), rows, rejected, on_batch)
+                        batch = []
+                        rows = rejected = 0
+
+                # Último lote, que marca la importación como terminada
+                state['done'] = 1
+                committed_before += self._commit(key, batch, state, csvfile.tell(),
+                                                 hasher.hexdigest(), rows, rejected, on_batch)
+
+        count_after = self.repo.count()
+
+        # Conciliar contadores: todas las filas leídas se han insertado o descartado, la
+        # tabla ha crecido exactamente lo insertado en esta ejecución y ninguna fila se ha
+        # insertado dos veces (al empezar de nuevo una importación con registros)
+        inserted_now = state['inserted'] - resumed['inserted'] - committed_before
+        return {
+            'file': key,
+            'rows': state['rows'],
+            'inserted': state['inserted'],
+            'rejected': state['rejected'],
+            'rows_this_run': state['rows'] - resumed['rows'],
+            'inserted_this_run': inserted_now,
+            'resumed_from_batch': resumed['batch'],
+            'resumed_from_offset': resumed['offset'],
+            'already_done': bool(resumed['done']),
+            'count_before': count_before,
+            'count_after': count_after,
+            'previously_inserted': previously_inserted,
+            'committed_before_resume': committed_before,
+            'reconciled': (
+                state['rows'] == state['inserted'] + state['rejected']
+                and count_after - count_before == inserted_now
+                and previously_inserted == 0
+            ),
+        }
+
+    @staticmethod
+    def format_report(report: dict) -> str:
+        """
+        Da formato de texto al informe de import_csv.
+        """
+        if report['already_done']:
+            return f"{report['file']} ya estaba importado ({report['inserted']} registros)"
+
+        lines = [
+            f"Filas leídas: {report['rows']} ({report['rows_this_run']} en esta ejecución)",
+            f"Registros insertados: {report['inserted']} ({report['inserted_this_run']} en esta ejecución)",
+            f"Filas descartadas: {report['rejected']}",
+            f"Registros en la base de datos: {report['count_before']} -> {report['count_after']}",
+        ]
+        if report['resumed_from_batch']:
+            lines.insert(0, f"Reanudado tras el lote {report['resumed_from_batch']} "
+                            f"(byte {report['resumed_from_offset']})")
+        if report['committed_before_resume']:
+            lines.append(f"{report['committed_before_resume']} registros ya se habían insertado "
+                         "antes de la interrupción")
+        if report['previously_inserted']:
+            lines.append(f"AVISO: los {report['previously_inserted']} registros de la importación "
+                         f"anterior de este fichero siguen en la base de datos (posibles duplicados)")
+        elif not report['reconciled']:
+            lines.append("AVISO: los contadores no cuadran")
+
+        return "\n".join(lines)
+
+    def _commit(self, key, batch, state, offset, digest, rows, rejected, on_batch) -> int:
+        """
+        Confirma un lote junto con el nuevo estado y actualiza 'state'.
+
+        Retorna:
+            - Número de registros del lote que no se han insertado porque ya estaban 
+              confirmados (ID 0): con shards, una importación interrumpida puede haber
+              confirmado el lote solo en parte de los shards.
+        """
+        new_state = dict(state)
+        new_state.update(
+            offset=offset,
+            digest=digest,
+            batch=state['batch'] + 1,
+            rows=state['rows'] + rows,
+            inserted=state['inserted'] + len(batch),
+            rejected=state['rejected'] + rejected,
+        )
+
+        ids = self.repo.import_batch(key, batch, new_state)
+        state.update(new_state)
+
+        # Notificar los registros insertados
+        for record, id in zip(batch, ids):
+            record.id = id
+        inserted = [record for record in batch if record.id]
+        if on_batch and inserted:
+            on_batch(inserted)
+
+        return len(batch) - len(inserted)
+
+    @classmethod
+    def _hash_prefix(cls, csvfile, offset: int):
+        """
+        Calcula el SHA-256 de los primeros 'offset' bytes del fichero binario 'csvfile' y
+        lo deja en esa posición. Devuelve el objeto hashlib, que se puede seguir 
+        actualizando.
+        """
+        hasher = hashlib.sha256()
+        csvfile.seek(0)
+
+        remaining = offset
+        while remaining:
+            block = csvfile.read(min(cls.HASH_BLOCK, remaining))
+            if not block:
+                break
+            hasher.update(block)
+            remaining -= len(block)
+
+        return hasher
+
+    @staticmethod
+    def _rows(csvfile, hasher=None):
+        """
+        Genera las filas de datos del fichero binario 'csvfile' desde la posición actual.
+        Se lee línea a línea (uniendo las líneas de los campos entre comillas que 
+        contienen saltos de línea) para que csvfile.tell() sea siempre el final de la 
+        última fila devuelta. Si se indica 'hasher', se actualiza con los bytes leídos.
+        """
+        while True:
+            line = csvfile.readline()
+            if not line:
+                return
+
+            # Un número impar de comillas indica un campo que continúa en otra línea
+            while line.count(b'"') % 2:
+                more = csvfile.readline()
+                if not more:
+                    break
+                line += more
+
+            if hasher is not None:
+                hasher.update(line)
+
+            text = line.decode('utf-8').strip('\r\n')
+            if text:
+                yield next(csv.reader([text]))
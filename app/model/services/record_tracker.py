@@ -0,0 +1,15 @@
+from ..repository.storage_backend import StorageBackend
+
+class RecordTracker:
+
+    def __init__(self, repository: StorageBackend):
+        self.repo = repository
+
+    def get_changes_since(self, seq: int = 0):
+        return self.repo.changes_since(seq)
+
+    def get_checkpoint(self, consumer: str) -> int:
+        return self.repo.get_checkpoint(consumer)
+
+    def set_checkpoint(self, consumer: str, seq: int) -> None:
+        self.repo.set_checkpoint(consumer, seq)
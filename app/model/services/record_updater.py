@@ -1,10 +1,16 @@
-from ..repository.record_repo import RecordRepository
+from ..repository.storage_backend import StorageBackend
 from ..data.record import Record
 
 class RecordUpdater:
 
-    def __init__(self, repository: RecordRepository):
+    def __init__(self, repository: StorageBackend):
         self.repo = repository
 
     def update_record(self, record: Record) -> bool:      
         return self.repo.update(record)
+
+    def update_records(self, records: list) -> int:
+        return self.repo.update_many(records)
+
+    def update_records_where(self, predicate: callable, transform: callable) -> int:
+        return self.repo.update_where(predicate, transform)
@@ -0,0 +1 @@
+from . import migrations, migrator
\ No newline at end of file
@@ -1,4 +1,14 @@
+-- Permite liberar páginas vacías con PRAGMA incremental_vacuum (mantenimiento). Solo
+-- tiene efecto si se ejecuta antes de crear la primera tabla de la base de datos.
+PRAGMA auto_vacuum = INCREMENTAL;
+
+-- Versión 1 del esquema (ver migrations/m001_primary_key.py). 'id' es un alias del rowid,
+-- de modo que los IDs son estables (VACUUM no los renumera).
 CREATE TABLE IF NOT EXISTS Agenda(
+    id INTEGER PRIMARY KEY,
     nombre TEXT NOT NULL,
-    telefono INTEGER -- PRIMARY KEY
-);
\ No newline at end of file
+    telefono INTEGER CHECK (typeof(telefono) IN ('integer', 'null'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_agenda_telefono ON Agenda(telefono);
+CREATE INDEX IF NOT EXISTS idx_agenda_nombre ON Agenda(nombre);
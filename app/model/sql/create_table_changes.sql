@@ -0,0 +1,35 @@
+-- Registro de cambios de la tabla Agenda. Cada inserción, actualización o borrado
+-- genera una fila con un número de secuencia estrictamente creciente (AUTOINCREMENT
+-- garantiza que nunca se reutiliza un número, incluso tras borrar filas).
+CREATE TABLE IF NOT EXISTS AgendaChanges(
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    op TEXT NOT NULL,            -- 'I' (insert), 'U' (update), 'D' (delete)
+    record_id INTEGER NOT NULL,
+    nombre TEXT,
+    telefono INTEGER,
+    fecha TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Último número de secuencia procesado por cada consumidor (exportación delta).
+CREATE TABLE IF NOT EXISTS ChangesCheckpoint(
+    consumer TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS agenda_after_insert AFTER INSERT ON Agenda
+BEGIN
+    INSERT INTO AgendaChanges(op, record_id, nombre, telefono)
+    VALUES ('I', NEW.rowid, NEW.nombre, NEW.telefono);
+END;
+
+CREATE TRIGGER IF NOT EXISTS agenda_after_update AFTER UPDATE ON Agenda
+BEGIN
+    INSERT INTO AgendaChanges(op, record_id, nombre, telefono)
+    VALUES ('U', NEW.rowid, NEW.nombre, NEW.telefono);
+END;
+
+CREATE TRIGGER IF NOT EXISTS agenda_after_delete AFTER DELETE ON Agenda
+BEGIN
+    INSERT INTO AgendaChanges(op, record_id, nombre, telefono)
+    VALUES ('D', OLD.rowid, OLD.nombre, OLD.telefono);
+END;
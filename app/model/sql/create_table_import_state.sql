@@ -0,0 +1,22 @@
+-- Estado de las importaciones de ficheros CSV. Se actualiza en la misma transacción que
+-- inserta cada lote, de modo que tras una interrupción la importación continúa justo
+-- después del último lote confirmado, sin insertar ningún registro dos veces.
+CREATE TABLE IF NOT EXISTS ImportState(
+    filename TEXT PRIMARY KEY,   -- ruta absoluta del fichero
+    size INTEGER NOT NULL,       -- tamaño del fichero al empezar la importación
+    offset INTEGER NOT NULL,     -- posición (bytes) tras el último lote confirmado
+    batch INTEGER NOT NULL,      -- número del último lote confirmado
+    rows INTEGER NOT NULL,       -- filas leídas hasta el último lote confirmado
+    inserted INTEGER NOT NULL,   -- registros insertados
+    rejected INTEGER NOT NULL,   -- filas descartadas por no ser válidas
+    done INTEGER NOT NULL DEFAULT 0
+);
+
+-- Huella del fichero tras el último lote confirmado, para detectar cambios que no alteran
+-- su tamaño. Se guarda aparte (y no como columnas de ImportState) para que las bases de
+-- datos existentes no necesiten una migración.
+CREATE TABLE IF NOT EXISTS ImportCheck(
+    filename TEXT PRIMARY KEY,   -- ruta absoluta del fichero
+    mtime REAL,                  -- fecha de modificación del fichero
+    digest TEXT                  -- SHA-256 de los bytes ya importados (hasta 'offset')
+);
@@ -0,0 +1,22 @@
+-- Registro de cambios combinado del motor 'sharded' (solo en el shard 0). Los cambios de
+-- cada shard se copian aquí una única vez, en orden de fecha, y reciben un número de
+-- secuencia global: es el que ven los consumidores y sigue siendo válido tras reabrir la
+-- base de datos. El rebalanceo sustituye el shard 0, de modo que el registro empieza de
+-- nuevo (como el de cada shard).
+CREATE TABLE IF NOT EXISTS ShardedChanges(
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    shard INTEGER NOT NULL,
+    shard_seq INTEGER NOT NULL,  -- número de secuencia del cambio en su shard
+    op TEXT NOT NULL,            -- 'I' (insert), 'U' (update), 'D' (delete)
+    record_id INTEGER NOT NULL,  -- ID global
+    nombre TEXT,
+    telefono INTEGER,
+    fecha TEXT NOT NULL,
+    UNIQUE (shard, shard_seq)
+);
+
+-- Último número de secuencia global procesado por cada consumidor.
+CREATE TABLE IF NOT EXISTS ShardedCheckpoint(
+    consumer TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL
+);
@@ -0,0 +1,14 @@
+"""
+Migraciones del esquema de la base de datos, en orden. Cada módulo define:
+    - VERSION (int): versión del esquema tras aplicarla (PRAGMA user_version).
+    - DESCRIPTION (str): descripción breve.
+    - migrate(conn, batch_size, pause, progress): aplica la migración. Debe actualizar
+      PRAGMA user_version en la misma transacción que termina la migración. Devuelve un
+      aviso para el usuario (por ejemplo, datos que no se han podido convertir) o ''.
+"""
+from . import m001_primary_key
+
+MIGRATIONS = [m001_primary_key]
+
+# Versión del esquema de las bases de datos nuevas
+SCHEMA_VERSION = MIGRATIONS[-1].VERSION
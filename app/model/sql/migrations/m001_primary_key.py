@@ -0,0 +1,190 @@
+"""
+Migración 1: clave primaria explícita, teléfonos enteros e índices.
+
+La tabla Agenda original no declara clave (usa el rowid implícito, que VACUUM puede 
+renumerar) y guarda los teléfonos con tipos mezclados. La migración copia los datos a 
+una tabla nueva con 'id INTEGER PRIMARY KEY' (conservando los IDs) por lotes, cada uno en
+una transacción corta, de modo que la aplicación puede seguir escribiendo mientras tanto:
+unos triggers de sincronización (persistentes, para que vean las escrituras de cualquier
+conexión; se eliminan al sustituir la tabla) replican en la tabla nueva los cambios de la
+antigua. Al final, en una única transacción breve, se sustituye una tabla por otra.
+
+Los teléfonos que no son numéricos se guardan como NULL, y los que tienen ceros a la 
+izquierda o espacios pierden ese formato. Antes de copiarlos, sus valores originales se 
+guardan en la tabla MigrationLostPhones, que se conserva después de la migración.
+"""
+import os, time
+
+VERSION = 1
+DESCRIPTION = "Agenda con id INTEGER PRIMARY KEY, teléfonos enteros e índices"
+
+# Conversión del teléfono: entero si son solo dígitos, NULL en otro caso
+PHONE = """
+    CASE WHEN trim({0}) <> '' AND trim({0}) NOT GLOB '*[^0-9]*'
+         THEN CAST(trim({0}) AS INTEGER) END
+"""
+
+# Condición de los teléfonos que no se conservan tal cual: la conversión da NULL o cambia
+# su texto (ceros a la izquierda, espacios, decimales...)
+LOSSY = """
+    {0} IS NOT NULL AND CAST(({1}) AS TEXT) IS NOT CAST({0} AS TEXT)
+"""
+
+# Valores originales de los teléfonos modificados por la migración
+CREATE_LOST_TABLE = """
+    CREATE TABLE IF NOT EXISTS MigrationLostPhones(
+        id INTEGER NOT NULL,         -- ID del registro
+        telefono,                    -- valor original, con su tipo
+        fecha TEXT NOT NULL DEFAULT (datetime('now')),
+        UNIQUE (id, telefono)
+    );
+"""
+
+CREATE_NEW_TABLE = """
+    CREATE TABLE IF NOT EXISTS Agenda_new(
+        id INTEGER PRIMARY KEY,
+        nombre TEXT NOT NULL,
+        telefono INTEGER CHECK (typeof(telefono) IN ('integer', 'null'))
+    );
+    CREATE INDEX IF NOT EXISTS idx_agenda_telefono ON Agenda_new(telefono);
+    CREATE INDEX IF NOT EXISTS idx_agenda_nombre ON Agenda_new(nombre);
+"""
+
+# Replican en Agenda_new los cambios que se hagan en Agenda durante la copia
+SYNC_TRIGGERS = f"""
+    CREATE TRIGGER IF NOT EXISTS migrate_sync_insert AFTER INSERT ON Agenda
+    BEGIN
+        INSERT OR IGNORE INTO MigrationLostPhones(id, telefono)
+        SELECT NEW.rowid, NEW.telefono
+        WHERE {LOSSY.format('NEW.telefono', PHONE.format('NEW.telefono'))};
+        INSERT OR REPLACE INTO Agenda_new(id, nombre, telefono)
+        VALUES (NEW.rowid, NEW.nombre, {PHONE.format('NEW.telefono')});
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS migrate_sync_update AFTER UPDATE ON Agenda
+    BEGIN
+        INSERT OR IGNORE INTO MigrationLostPhones(id, telefono)
+        SELECT NEW.rowid, NEW.telefono
+        WHERE {LOSSY.format('NEW.telefono', PHONE.format('NEW.telefono'))};
+        DELETE FROM Agenda_new WHERE id = OLD.rowid;
+        INSERT OR REPLACE INTO Agenda_new(id, nombre, telefono)
+        VALUES (NEW.rowid, NEW.nombre, {PHONE.format('NEW.telefono')});
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS migrate_sync_delete AFTER DELETE ON Agenda
+    BEGIN
+        DELETE FROM Agenda_new WHERE id = OLD.rowid;
+    END;
+"""
+
+# Copia un lote. Los registros que ya estén en Agenda_new (copiados por los triggers) se
+# ignoran: su versión es la más reciente.
+COPY_BATCH = f"""
+    INSERT OR IGNORE INTO Agenda_new(id, nombre, telefono)
+    SELECT rowid, nombre, {PHONE.format('telefono')} FROM Agenda
+    WHERE rowid > ? AND rowid <= ?
+"""
+
+# Guarda los teléfonos de un lote que la copia va a modificar
+SAVE_LOST_BATCH = f"""
+    INSERT OR IGNORE INTO MigrationLostPhones(id, telefono)
+    SELECT rowid, telefono FROM Agenda
+    WHERE rowid > ? AND rowid <= ? AND {LOSSY.format('telefono', PHONE.format('telefono'))}
+"""
+
+SWAP_TABLES = """
+    BEGIN IMMEDIATE;
+    DROP TRIGGER migrate_sync_insert;
+    DROP TRIGGER migrate_sync_update;
+    DROP TRIGGER migrate_sync_delete;
+    DROP TABLE Agenda;
+    ALTER TABLE Agenda_new RENAME TO Agenda;
+    {changes}
+    PRAGMA user_version = {version};
+    COMMIT;
+"""
+
+
+def is_applied(conn) -> bool:
+    """
+    Indica si la tabla Agenda ya tiene la columna 'id'.
+    """
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(Agenda)")]
+    return 'id' in columns
+
+
+def lost_phones(conn) -> int:
+    """
+    Devuelve el número de teléfonos guardados en MigrationLostPhones.
+    """
+    query = "SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name='MigrationLostPhones'"
+    if conn.execute(query).fetchone()[0] == 0:
+        return 0
+    return conn.execute("SELECT COUNT(*) FROM MigrationLostPhones").fetchone()[0]
+
+
+def migrate(conn, batch_size: int = 1000, pause: float = 0.01, progress: callable = None) -> str:
+    """
+    Aplica la migración. Si se interrumpe, se puede volver a lanzar: la copia se repite
+    desde el principio ignorando los registros ya copiados.
+
+    Parámetros:
+        - conn (sqlite3.Connection): conexión en modo autocommit (isolation_level=None).
+        - batch_size (int): registros copiados por transacción.
+        - pause (float): segundos de espera entre lotes, para dejar paso a otras escrituras.
+        - progress (callable): recibe (registros copiados, total aproximado) tras cada lote.
+
+    Retorna:
+        - Un aviso con el número de teléfonos modificados (guardados en 
+          MigrationLostPhones), o una cadena vacía si no hay ninguno.
+    """
+    # La base de datos ya tiene el esquema nuevo: solo falta marcar la versión
+    if is_applied(conn):
+        conn.execute(f"PRAGMA user_version = {VERSION}")
+        return ''
+
+    # Tabla nueva, tabla de teléfonos modificados y triggers de sincronización
+    conn.executescript(
+        "BEGIN IMMEDIATE;" + CREATE_NEW_TABLE + CREATE_LOST_TABLE + SYNC_TRIGGERS + "COMMIT;"
+    )
+
+    # Copia por lotes de rowid, cada uno en su propia transacción
+    total = conn.execute("SELECT COUNT(*) FROM Agenda").fetchone()[0]
+    copied = 0
+    last_id = 0
+
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            query = "SELECT rowid FROM Agenda WHERE rowid > ? ORDER BY rowid LIMIT ?"
+            ids = [row[0] for row in conn.execute(query, (last_id, batch_size))]
+            if ids:
+                conn.execute(SAVE_LOST_BATCH, (last_id, ids[-1]))
+                conn.execute(COPY_BATCH, (last_id, ids[-1]))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        if not ids:
+            break
+
+        last_id = ids[-1]
+        copied += len(ids)
+        if progress:
+            progress(copied, total)
+
+        time.sleep(pause)
+
+    # Sustituir la tabla y volver a crear los triggers del registro de cambios
+    dirname = os.path.dirname(os.path.dirname(__file__))
+    with open(os.path.join(dirname, 'create_table_changes.sql')) as sql_file:
+        changes = sql_file.read()
+
+    conn.executescript(SWAP_TABLES.format(changes=changes, version=VERSION))
+
+    lost = lost_phones(conn)
+    if not lost:
+        return ''
+    return (f"{lost} teléfonos no se han podido conservar tal cual (no numéricos, ceros a la "
+            f"izquierda...); sus valores originales están en la tabla MigrationLostPhones")
@@ -0,0 +1,82 @@
+"""
+ - Fichero: migrator.py
+ - Descripción: Aplica las migraciones pendientes del esquema de la base de datos
+ - Autor: Alejandro Ruiz Becerra
+"""
+from .migrations import MIGRATIONS
+import sqlite3
+
+
+class Migrator:
+    """
+    Lleva una base de datos SQLite a la última versión del esquema (SCHEMA_VERSION). La
+    versión actual se guarda en PRAGMA user_version.
+    """
+
+    def __init__(self, db: str, batch_size: int = 1000, pause: float = 0.01):
+        """
+        Inicializador
+
+        Parámetros:
+            - db (str): fichero de la base de datos.
+            - batch_size (int): registros por transacción en las migraciones por lotes.
+            - pause (float): segundos de espera entre lotes.
+        """
+        self.db = db
+        self.batch_size = batch_size
+        self.pause = pause
+
+
+    def __connect(self) -> sqlite3.Connection:
+        """
+        Abre una conexión en modo autocommit: las migraciones gestionan sus transacciones.
+        """
+        return sqlite3.connect(self.db, isolation_level=None)
+
+
+    def version(self) -> int:
+        """
+        Devuelve la versión del esquema de la base de datos.
+        """
+        conn = self.__connect()
+        try:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            conn.close()
+
+
+    def pending(self) -> list:
+        """
+        Devuelve las migraciones pendientes, en orden.
+        """
+        version = self.version()
+        return [migration for migration in MIGRATIONS if migration.VERSION > version]
+
+
+    def run(self, progress: callable = None) -> list:
+        """
+        Aplica las migraciones pendientes.
+
+        Parámetros:
+            - progress (callable): recibe (migración, registros copiados, total) durante 
+              las migraciones por lotes.
+
+        Retorna:
+            - Lista de pares (descripción, aviso) de las migraciones aplicadas. El aviso es
+              una cadena vacía si la migración no tiene nada que señalar.
+        """
+        applied = []
+
+        for migration in self.pending():
+            conn = self.__connect()
+            try:
+                callback = None
+                if progress:
+                    callback = lambda copied, total: progress(migration, copied, total)
+                note = migration.migrate(conn, self.batch_size, self.pause, callback)
+            finally:
+                conn.close()
+
+            applied.append((f"{migration.VERSION}: {migration.DESCRIPTION}", note or ''))
+
+        return applied
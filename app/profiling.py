@@ -0,0 +1,193 @@
+"""
+ - Fichero: profiling.py
+ - Descripción: Modo de perfilado de la aplicación (cProfile y tracemalloc)
+ - Autor: Alejandro Ruiz Becerra
+
+Cuando se activa (--profile DIR o AGENDA_PROFILE=DIR), cada acción del controlador se
+ejecuta bajo cProfile y tracemalloc, y al terminar se escribe en DIR un informe de texto
+(funciones más costosas, pico de memoria y líneas que más memoria reservan) y el fichero
+.prof con las estadísticas completas (se puede abrir con pstats o snakeviz).
+"""
+import contextlib, cProfile, io, itertools, os, pstats, time, tracemalloc
+
+# Número de funciones y de líneas de asignación de memoria en cada informe
+TOP_FUNCTIONS = 25
+TOP_ALLOCATIONS = 15
+
+# Numeración de los informes, para que no se sobrescriban
+_report_numbers = itertools.count(1)
+
+
+class ProfileSession:
+    """
+    Perfilado de una acción. Puede pausarse y reanudarse (por ejemplo, la carga inicial, 
+    que se reparte en varios bloques entre eventos de la interfaz).
+    """
+
+    def __init__(self, name: str, directory: str):
+        self.name = name
+        self.directory = directory
+        self.profile = cProfile.Profile()
+        self.elapsed = 0.0
+        self.peak = 0
+        self.start_snapshot = tracemalloc.take_snapshot()
+        self.start_memory = tracemalloc.get_traced_memory()[0]
+
+
+    def resume(self) -> None:
+        """
+        Reanuda (o empieza) la medición.
+        """
+        tracemalloc.reset_peak()
+        self.resumed = time.perf_counter()
+        self.profile.enable()
+
+
+    def pause(self) -> None:
+        """
+        Pausa la medición.
+        """
+        self.profile.disable()
+        self.elapsed += time.perf_counter() - self.resumed
+        self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+
+
+    def finish(self) -> str:
+        """
+        Termina la medición y escribe los informes.
+
+        Retorna:
+            - La ruta del informe de texto.
+        """
+        end_snapshot = tracemalloc.take_snapshot()
+        end_memory = tracemalloc.get_traced_memory()[0]
+
+        # Nombre único por acción e instante
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        number = next(_report_numbers)
+        base = os.path.join(self.directory, f"{stamp}_{os.getpid()}_{number:04d}_{self.name}")
+
+        # Estadísticas completas de cProfile
+        self.profile.dump_stats(base + '.prof')
+
+        # Funciones más costosas
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_FUNCTIONS)
+
+        # Líneas que más memoria han reservado durante la acción
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        allocations = end_snapshot.filter_traces(ignore).compare_to(
+            self.start_snapshot.filter_traces(ignore), 'lineno'
+        )[:TOP_ALLOCATIONS]
+
+        with open(base + '.txt', 'w') as report:
+            report.write(f"Acción: {self.name}\n")
+            report.write(f"Duración: {self.elapsed:.4f} s\n")
+            report.write(f"Memoria: pico {self.peak / 1024:.1f} KiB, "
+                         f"variación {(end_memory - self.start_memory) / 1024:+.1f} KiB\n\n")
+            report.write(f"Funciones (top {TOP_FUNCTIONS}, por tiempo acumulado)\n")
+            report.write(stream.getvalue())
+            report.write(f"\nAsignaciones de memoria (top {TOP_ALLOCATIONS}, memoria retenida al terminar)\n")
+            report.writelines(f"{stat}\n" for stat in allocations)
+
+        return base + '.txt'
+
+
+class Profiler:
+    """
+    Crea las sesiones de perfilado. Solo hay una sesión midiendo a la vez: las acciones 
+    lanzadas desde otra acción se miden como parte de ella.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Inicializador
+
+        Parámetros:
+            - directory (str): directorio donde se escriben los informes.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        self.active = None
+        self.sessions = {}
+
+
+    def wrap(self, name: str, action: callable) -> callable:
+        """
+        Devuelve 'action' envuelta para que cada llamada genere un informe 'name'.
+        """
+        def profiled(*args, **kwargs):
+            # Llamada anidada: se mide dentro de la acción en curso
+            if self.active:
+                return action(*args, **kwargs)
+
+            session = ProfileSession(name, self.directory)
+            self.active = session
+            session.resume()
+            try:
+                return action(*args, **kwargs)
+            finally:
+                session.pause()
+                self.active = None
+                session.finish()
+
+        return profiled
+
+
+    @contextlib.contextmanager
+    def paused(self):
+        """
+        Pausa la sesión en curso mientras se ejecuta el bloque 'with' (por ejemplo, un 
+        diálogo que espera al usuario) y la reanuda al salir. Sin sesión en curso, no hace 
+        nada.
+        """
+        session = self.active
+        if session is None:
+            yield
+            return
+
+        session.pause()
+        try:
+            yield
+        finally:
+            session.resume()
+
+
+    def resume(self, name: str) -> None:
+        """
+        Reanuda (o empieza) la sesión 'name', que se reparte en varias llamadas. 
+        """
+        if self.active:
+            return
+
+        session = self.sessions.get(name)
+        if session is None:
+            session = self.sessions[name] = ProfileSession(name, self.directory)
+
+        self.active = session
+        session.resume()
+
+
+    def pause(self, name: str) -> None:
+        """
+        Pausa la sesión 'name'.
+        """
+        session = self.sessions.get(name)
+        if session is not None and self.active is session:
+            session.pause()
+            self.active = None
+
+
+    def finish(self, name: str) -> None:
+        """
+        Termina la sesión 'name' y escribe sus informes.
+        """
+        self.pause(name)
+        session = self.sessions.pop(name, None)
+        if session is not None:
+            session.finish()
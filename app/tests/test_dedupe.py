@@ -0,0 +1,70 @@
+"""
+ - Fichero: test_dedupe.py
+ - Descripción: Pruebas de la detección y fusión de contactos duplicados
+ - Uso (desde el directorio app): python -m unittest discover tests
+"""
+from model.data.record import Record
+from model.dedupe.engine import DedupeEngine
+from model.repository.record_repo import RecordRepository
+import csv, os, tempfile, unittest
+
+
+class DedupeEngineTest(unittest.TestCase):
+
+    CONTACTS = [
+        ("Maria Lopez", "600000001"),
+        ("Mario Lopez", "600000002"),     # otra persona con nombre parecido
+        ("maria  lópez", "600000001"),    # duplicado exacto de la primera
+        ("Juan Garcia", "600000003"),
+        ("Juana Garcia", "600000004"),
+    ]
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo = RecordRepository(os.path.join(self.tmpdir.name, 'agenda.db'))
+        for name, number in self.CONTACTS:
+            self.repo.insert(Record(name=name, number=number))
+
+        self.archive = os.path.join(self.tmpdir.name, 'removed.csv')
+        self.engine = DedupeEngine(self.repo, archive=self.archive)
+        self.clusters = self.engine.find_duplicates()
+
+    def tearDown(self):
+        self.engine.close()
+        self.repo.close()
+        self.tmpdir.cleanup()
+
+    def test_merge_keeps_different_numbers(self):
+        removed = [id for cluster in self.clusters for id in self.engine.merge(cluster)]
+
+        self.assertEqual(removed, [3])
+        self.assertEqual(sorted(name for _, name, _ in self.repo.get_all()),
+                         ["Juan Garcia", "Juana Garcia", "Maria Lopez", "Mario Lopez"])
+
+    def test_merge_plan_with_different_numbers(self):
+        plan = [(record.id, kept.id) for cluster in self.clusters
+                for record, kept in self.engine.merge_plan(cluster, different_numbers=True)]
+        self.assertEqual(sorted(plan), [(2, 1), (3, 1), (5, 4)])
+
+    def test_exact_duplicate_of_other_member_is_merged(self):
+        # 'Mario Lopez' repetido: no es duplicado directo del registro conservado (1),
+        # pero sí del 2, que se conserva en su grupo
+        self.repo.insert(Record(name="Mario Lopez", number="600000002"))
+        clusters = self.engine.find_duplicates()
+
+        plan = [(record.id, kept.id) for cluster in clusters
+                for record, kept in self.engine.merge_plan(cluster)]
+        self.assertEqual(sorted(plan), [(3, 1), (6, 2)])
+
+    def test_removed_records_are_archived(self):
+        for cluster in self.clusters:
+            self.engine.merge(cluster, different_numbers=True)
+
+        with open(self.archive, newline='') as csvfile:
+            rows = list(csv.DictReader(csvfile))
+        self.assertEqual(sorted((row['id'], row['number'], row['kept_id']) for row in rows),
+                         [('2', '600000002', '1'), ('3', '600000001', '1'), ('5', '600000004', '4')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+ - Fichero: test_migrations.py
+ - Descripción: Pruebas de las migraciones del esquema
+ - Uso (desde el directorio app): python -m unittest discover tests
+"""
+from model.repository.record_repo import RecordRepository
+from model.sql.migrations import SCHEMA_VERSION
+from model.sql.migrator import Migrator
+import os, sqlite3, tempfile, unittest
+
+# Esquema original de la tabla Agenda (versión 0)
+BASELINE_SCHEMA = "CREATE TABLE Agenda(nombre TEXT NOT NULL, telefono INTEGER)"
+
+
+class PrimaryKeyMigrationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmpdir.name, 'agenda.db')
+
+        conn = sqlite3.connect(self.db)
+        conn.execute(BASELINE_SCHEMA)
+        conn.executemany("INSERT INTO Agenda VALUES (?, ?)", [
+            ("Ana", 612345678),
+            ("Luis", "612345679"),
+            ("Eva", "abc"),
+            ("Pepe", "+34 612345670"),
+            ("Rosa", None),
+        ] + [(f"Contacto {i}", 700000000 + i) for i in range(20)])
+        conn.commit()
+        conn.close()
+
+        # Abrir con la aplicación crea las tablas del registro de cambios, no la nueva Agenda
+        RecordRepository(self.db).close()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def query(self, sql: str) -> list:
+        conn = sqlite3.connect(self.db)
+        try:
+            return conn.execute(sql).fetchall()
+        finally:
+            conn.close()
+
+    def test_baseline_database_is_migrated(self):
+        migrator = Migrator(self.db, batch_size=7, pause=0)
+        self.assertEqual(migrator.version(), 0)
+
+        (description, note), = migrator.run()
+        self.assertEqual(migrator.version(), SCHEMA_VERSION)
+        self.assertIn("2 teléfonos", note)
+
+        rows = self.query("SELECT id, nombre, telefono FROM Agenda ORDER BY id")
+        self.assertEqual(rows[:5], [
+            (1, "Ana", 612345678),
+            (2, "Luis", 612345679),
+            (3, "Eva", None),
+            (4, "Pepe", None),
+            (5, "Rosa", None),
+        ])
+        self.assertEqual(len(rows), 25)
+
+        # Los valores originales que no se conservan tal cual están guardados
+        lost = self.query("SELECT id, telefono FROM MigrationLostPhones ORDER BY id")
+        self.assertEqual(lost, [(3, "abc"), (4, "+34 612345670")])
+
+    def test_writes_during_copy_are_kept(self):
+        conn = sqlite3.connect(self.db, isolation_level=None)
+
+        # Escrituras de otra conexión entre lotes
+        def progress(migration, copied, total):
+            if copied == 7:
+                conn.execute("INSERT INTO Agenda VALUES ('Nuevo', '+34 600')")
+                conn.execute("UPDATE Agenda SET nombre='Ana B' WHERE rowid=1")
+                conn.execute("DELETE FROM Agenda WHERE rowid=20")
+
+        Migrator(self.db, batch_size=7, pause=0).run(progress)
+        conn.close()
+
+        rows = dict((id, (name, number)) for id, name, number in
+                    self.query("SELECT id, nombre, telefono FROM Agenda"))
+        self.assertEqual(rows[1], ("Ana B", 612345678))
+        self.assertEqual(rows[26], ("Nuevo", None))
+        self.assertNotIn(20, rows)
+        self.assertEqual(len(rows), 25)
+
+        lost = self.query("SELECT id, telefono FROM MigrationLostPhones ORDER BY id")
+        self.assertEqual(lost, [(3, "abc"), (4, "+34 612345670"), (26, "+34 600")])
+
+        # Los triggers de sincronización se han eliminado
+        triggers = self.query("SELECT name FROM sqlite_master WHERE name LIKE 'migrate_sync_%'")
+        self.assertEqual(triggers, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+ - Fichero: test_record_importer.py
+ - Descripción: Pruebas de las importaciones CSV reanudables
+ - Uso (desde el directorio app): python -m unittest discover tests
+"""
+from model.repository.factory import create_repository
+from model.services.record_importer import RecordImporter, FileChangedError
+import os, sqlite3, string, tempfile, unittest
+
+
+def name(i: int) -> str:
+    """
+    Nombre válido (solo letras) y distinto para cada 'i'.
+    """
+    letters = ''
+    for _ in range(3):
+        letters += string.ascii_lowercase[i % 26]
+        i //= 26
+    return f"Persona {letters}"
+
+
+class Interrupted(Exception):
+    pass
+
+
+class RecordImporterTest(unittest.TestCase):
+
+    # Motores sobre los que se repite cada prueba
+    BACKENDS = ['sqlite', 'memory']
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.csv = os.path.join(self.tmpdir.name, 'agenda.csv')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def interrupted_import(self, backend: str):
+        """
+        Crea un fichero de 250 filas, importa el primer lote de 100 e interrumpe la 
+        importación.
+        """
+        with open(self.csv, 'w') as csvfile:
+            csvfile.write("NOMBRE,TELEFONO\n")
+            for i in range(250):
+                csvfile.write(f"{name(i)},{700000000 + i}\n")
+
+        repo = create_repository(backend, os.path.join(self.tmpdir.name, f'{backend}.db'))
+        service = RecordImporter(repo)
+
+        def interrupt(records):
+            raise Interrupted()
+
+        with self.assertRaises(Interrupted):
+            service.import_csv(self.csv, 100, interrupt)
+        self.assertEqual(repo.count(), 100)
+
+        return repo, service
+
+    def test_resume_inserts_each_row_once(self):
+        for backend in self.BACKENDS:
+            with self.subTest(backend=backend):
+                repo, service = self.interrupted_import(backend)
+
+                report = service.import_csv(self.csv, 100)
+                self.assertEqual(report['resumed_from_batch'], 1)
+                self.assertEqual(report['inserted_this_run'], 150)
+                self.assertTrue(report['reconciled'])
+                self.assertEqual(repo.count(), 250)
+                self.assertEqual(len({number for _, _, number in repo.get_all()}), 250)
+
+                # Importarlo otra vez no inserta nada
+                self.assertTrue(service.import_csv(self.csv, 100)['already_done'])
+                self.assertEqual(repo.count(), 250)
+                repo.close()
+
+    def test_resume_after_partial_sharded_batch(self):
+        repo, service = self.interrupted_import('sharded')
+
+        # El segundo lote falla en un shard y se confirma en los demás
+        shard = repo.shards[1]
+        import_batch = shard.import_batch
+
+        def failing(filename, records, state):
+            raise sqlite3.OperationalError("disk I/O error")
+
+        shard.import_batch = failing
+        with self.assertRaises(sqlite3.OperationalError):
+            service.import_csv(self.csv, 100)
+        shard.import_batch = import_batch
+        committed = repo.count() - 100
+        self.assertGreater(committed, 0)
+
+        # Al reanudar, los registros de los shards que ya tenían el lote no se cuentan 
+        # como insertados en esta ejecución
+        report = service.import_csv(self.csv, 100)
+        self.assertEqual(report['resumed_from_batch'], 1)
+        self.assertEqual(report['committed_before_resume'], committed)
+        self.assertEqual(report['inserted_this_run'], 150 - committed)
+        self.assertTrue(report['reconciled'])
+        self.assertEqual(repo.count(), 250)
+        repo.close()
+
+    def test_same_size_edit_is_refused(self):
+        for backend in self.BACKENDS:
+            with self.subTest(backend=backend):
+                repo, service = self.interrupted_import(backend)
+
+                # Cambiar un dígito de la parte ya importada, sin cambiar tamaño ni fecha
+                stat = os.stat(self.csv)
+                with open(self.csv, 'r+b') as csvfile:
+                    content = csvfile.read()
+                    csvfile.seek(0)
+                    csvfile.write(content.replace(b'700000005', b'700000095'))
+                os.utime(self.csv, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+                with self.assertRaises(FileChangedError):
+                    service.import_csv(self.csv, 100)
+                self.assertEqual(repo.count(), 100)
+                repo.close()
+
+    def test_appended_file_is_refused_until_restart(self):
+        for backend in self.BACKENDS:
+            with self.subTest(backend=backend):
+                repo, service = self.interrupted_import(backend)
+                with open(self.csv, 'a') as csvfile:
+                    csvfile.write("Persona nueva,799999999\n")
+
+                with self.assertRaises(FileChangedError):
+                    service.import_csv(self.csv, 100)
+                self.assertEqual(repo.count(), 100)
+
+                # Empezar de nuevo: las 100 filas anteriores se repiten y se avisa de ello
+                report = service.import_csv(self.csv, 100, restart=True)
+                self.assertEqual(report['previously_inserted'], 100)
+                self.assertFalse(report['reconciled'])
+                self.assertEqual(repo.count(), 351)
+                repo.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+ - Fichero: test_record_repo.py
+ - Descripción: Pruebas del motor de almacenamiento SQLite
+ - Uso (desde el directorio app): python -m unittest discover tests
+"""
+from model.data.record import Record
+from model.repository.record_repo import RecordRepository
+import os, sqlite3, tempfile, unittest
+
+
+class UpdateWhereTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmpdir.name, 'agenda.db')
+        self.repo = RecordRepository(self.db)
+        for i in range(5):
+            self.repo.insert(Record(name=f"Contacto {chr(97 + i)}", number=str(600000000 + i)))
+        self.before = self.repo.get_all()
+
+    def tearDown(self):
+        self.repo.close()
+        self.tmpdir.cleanup()
+
+    def test_integrity_error_rolls_back_every_row(self):
+        # Los tres primeros cambios son válidos; el cuarto incumple el CHECK de 'telefono'
+        def transform(record):
+            record.number = 'abc' if record.id == 4 else str(700000000 + record.id)
+            return record
+
+        self.assertEqual(self.repo.update_where(lambda record: True, transform), 0)
+        self.assertEqual(self.repo.get_all(), self.before)
+
+    def test_error_in_transform_rolls_back_and_releases_lock(self):
+        def transform(record):
+            raise RuntimeError("transform")
+
+        with self.assertRaises(RuntimeError):
+            self.repo.update_where(lambda record: True, transform)
+        self.assertEqual(self.repo.get_all(), self.before)
+
+        # Otra conexión puede escribir: el bloqueo se ha liberado
+        conn = sqlite3.connect(self.db, timeout=0.1)
+        conn.execute("UPDATE Agenda SET nombre='Otro' WHERE id=1")
+        conn.commit()
+        conn.close()
+
+    def test_concurrent_writer_waits_for_update(self):
+        conn = sqlite3.connect(self.db, timeout=0)
+        blocked = []
+
+        # Mientras update_where recorre la tabla, otra conexión no puede escribir
+        def predicate(record):
+            try:
+                conn.execute("UPDATE Agenda SET nombre='Otro' WHERE id=1")
+                conn.commit()
+            except sqlite3.OperationalError:
+                blocked.append(record.id)
+            return True
+
+        def transform(record):
+            record.name += " bis"
+            return record
+
+        self.assertEqual(self.repo.update_where(predicate, transform), 5)
+        conn.close()
+        self.assertEqual(blocked, [1, 2, 3, 4, 5])
+        self.assertTrue(all(name.endswith(" bis") for _, name, _ in self.repo.get_all()))
+
+
+if __name__ == '__main__':
+    unittest.main()
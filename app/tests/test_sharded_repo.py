@@ -0,0 +1,119 @@
+"""
+ - Fichero: test_sharded_repo.py
+ - Descripción: Pruebas del motor de almacenamiento 'sharded'
+ - Uso (desde el directorio app): python -m unittest discover tests
+"""
+from model.data.record import Record
+from model.repository.sharded_repo import ShardedRepository, PartialUpdateError
+import os, shutil, tempfile, unittest
+
+
+class ShardedRepositoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmpdir.name, 'agenda.db')
+        self.repo = ShardedRepository(self.db, shards=4)
+        self.ids = [
+            self.repo.insert(Record(name=f"Contacto {chr(97 + i)}", number=str(600000000 + i)))
+            for i in range(20)
+        ]
+
+    def tearDown(self):
+        self.repo.close()
+        self.tmpdir.cleanup()
+
+    def test_route_uses_stored_number(self):
+        # '0612345678' se guarda como 612345678: mismo shard que el número
+        for shards in (3, 4, 8):
+            self.assertEqual(ShardedRepository.route('0612345678', shards),
+                             ShardedRepository.route(612345678, shards))
+
+    def test_iter_chunks_matches_get_all(self):
+        rows = [row for chunk in self.repo.iter_chunks(3) for row in chunk]
+        self.assertEqual(rows, self.repo.get_all())
+        self.assertEqual(sorted(row[0] for row in rows), sorted(self.ids))
+
+    def test_changes_since_uses_global_ids(self):
+        changes = list(self.repo.changes_since(0))
+        self.assertEqual(sorted(change[2] for change in changes), sorted(self.ids))
+
+        # Avanzar el punto de control a mitad y leer el resto
+        self.repo.set_checkpoint('test', changes[9][0])
+        rest = list(self.repo.changes_since(self.repo.get_checkpoint('test')))
+        self.assertEqual(rest, changes[10:])
+
+    def test_update_where_reports_failed_shards(self):
+        before = self.repo.get_all()
+
+        # El registro self.ids[0] incumple el CHECK: su shard deshace toda su parte
+        def transform(record):
+            record.number = 'abc' if record.id == self.ids[0] else str(700000000 + record.id)
+            return record
+
+        with self.assertRaises(PartialUpdateError) as cm:
+            self.repo.update_where(lambda record: True, transform)
+
+        failed = self.ids[0] % self.repo.n
+        self.assertEqual(cm.exception.failed, [failed])
+        self.assertEqual(sorted(cm.exception.rolled_back),
+                         sorted(id for id in self.ids if id % self.repo.n == failed))
+        self.assertEqual(cm.exception.updated, 20 - len(cm.exception.rolled_back))
+
+        # Los demás shards han confirmado su parte
+        for (id, name, number), old in zip(self.repo.get_all(), before):
+            if id in cm.exception.rolled_back:
+                self.assertEqual((id, name, number), old)
+            else:
+                self.assertEqual(number, 700000000 + id)
+
+    def test_seq_survives_reopening(self):
+        changes = list(self.repo.changes_since(0))
+        self.assertEqual([change[0] for change in changes], list(range(1, 21)))
+
+        # Un número leído antes de cerrar (por ejemplo, de un CSV) sigue siendo válido
+        seq = changes[9][0]
+        self.repo.set_checkpoint('test', seq)
+        self.repo.close()
+        self.repo = ShardedRepository(self.db)
+        id = self.repo.insert(Record(name="Contacto nuevo", number="699999999"))
+
+        self.assertEqual(self.repo.get_checkpoint('test'), seq)
+        rest = list(self.repo.changes_since(seq))
+        self.assertEqual(rest[:10], changes[10:])
+        self.assertEqual([change[:3] for change in rest[10:]], [(21, 'I', id)])
+
+    def test_concurrent_readers_get_the_same_seqs(self):
+        first, second = self.repo.changes_since(0), self.repo.changes_since(5)
+        self.assertEqual(next(first)[0], 1)
+        self.assertEqual(next(second)[0], 6)
+        self.repo.delete(Record(self.ids[0]))
+
+        self.assertEqual([change[0] for change in first], list(range(2, 21)))
+        self.assertEqual([change[0] for change in self.repo.changes_since(20)], [21])
+
+    def test_rebalance_recovers_interrupted_swap(self):
+        before = [row[1:] for row in self.repo.get_all()]
+        self.assertEqual(self.repo.rebalance(3, chunk_size=7), 20)
+        self.assertEqual(sorted(row[1:] for row in self.repo.get_all()), sorted(before))
+
+        # Simular una interrupción a mitad de la sustitución: copia completa y marcador
+        # escritos, y solo el primer shard actual renombrado a '.old'
+        self.repo.close()
+        shard_file = ShardedRepository.shard_file
+        base = os.path.splitext(self.db)[0]
+        for k in range(3):
+            shutil.copy(shard_file(base, k), shard_file(base + '.rebalance', k))
+        os.replace(shard_file(base, 0), shard_file(base + '.old', 0))
+        with open(base + '.rebalance.json', 'w') as json_file:
+            json_file.write('{"shards": 3, "previous": 3}')
+
+        self.repo = ShardedRepository(self.db)
+        self.assertEqual(self.repo.n, 3)
+        self.assertEqual(sorted(row[1:] for row in self.repo.get_all()), sorted(before))
+        self.assertEqual(sorted(os.listdir(self.tmpdir.name)),
+                         ['agenda.shard0.db', 'agenda.shard1.db', 'agenda.shard2.db', 'agenda.shards.json'])
+
+
+if __name__ == '__main__':
+    unittest.main()
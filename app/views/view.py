@@ -38,6 +38,7 @@ class MainWindow(Tk):
         self._init_treeview()
         self._init_input_frame()
         self._init_buttons_frame()
+        self._init_status_bar()
         self._init_click_binder()
         
 
@@ -46,7 +47,7 @@ class MainWindow(Tk):
         Crea y configura la ventana principal del programa
         """
         self.title('Proyecto Final - TreeView')
-        self.geometry("625x475")
+        self.geometry("625x500")
         self.resizable(False, False)
 
 
@@ -131,6 +132,9 @@ class MainWindow(Tk):
         self.tree_view.tag_configure('oddrow', background="white")
         self.tree_view.tag_configure('evenrow', background="lightblue")
 
+        # Número de filas de la tabla, para no tener que contarlas en cada inserción
+        self.row_count = 0
+
 
     def _init_input_frame(self) -> None:
         """
@@ -218,6 +222,29 @@ class MainWindow(Tk):
         self.clear_button.configure(command=self.clear)
 
 
+    def _init_status_bar(self) -> None:
+        """
+        Crea la barra de estado, con el total de contactos y el rango de IDs mostrado.
+        """
+        self.status_bar = Label(self, bd=1, relief=SUNKEN, anchor=W)
+        self.status_bar.pack(side=BOTTOM, fill=X)
+
+
+    def set_status(self, total : int, first : int = None, last : int = None) -> None:
+        """
+        Actualiza el texto de la barra de estado.
+
+        Parámetros:
+          - total (int) : número total de contactos
+          - first (int) : primer ID mostrado (None si la tabla está vacía)
+          - last (int) : último ID mostrado (None si la tabla está vacía)
+        """
+        text = f"Contactos: {total}"
+        if first is not None:
+            text += f"    |    IDs: {first} - {last}"
+        self.status_bar.configure(text=text)
+
+
     def set_add_button_handler(self, handler: callable = None) -> None:
         """
         Configura el funcionamiento del botón 'añadir'.
@@ -280,10 +307,33 @@ class MainWindow(Tk):
         Añade un nuevo registro. Actualiza la tabla de datos (TreeView).
 
         Parámetros:
-          - id (int) : Id del nuevo registro
+          - record (dict) : nuevo registro, con claves id, name y number
+        """
+        self._insert_row(record)
+
+        # Limpiar inputs
+        self.clear()
+
+
+    def add_records(self, records) -> None:
+        """
+        Añade varios registros a la tabla de datos (TreeView). Los registros que ya están
+        en la tabla se ignoran.
+
+        Parámetros:
+          - records (iterable de dict) : registros, con claves id, name y number
+        """
+        for record in records:
+            if not self.tree_view.exists(str(record['id'])):
+                self._insert_row(record)
+
+
+    def _insert_row(self, record : dict) -> None:
+        """
+        Inserta una fila al final de la tabla de datos (TreeView).
         """
         # Recuperar número de elementos en la tabla
-        i = len(self.tree_view.get_children())
+        i = self.row_count
 
         # Recuperar los datos del nuevo registro.
         data = [record['id'], record['name'], record['number']]
@@ -299,9 +349,7 @@ class MainWindow(Tk):
             values=data,
             tags=(tag)
         )
-
-        # Limpiar inputs
-        self.clear()
+        self.row_count += 1
 
 
     def update_record(self) -> None:
@@ -323,6 +371,24 @@ class MainWindow(Tk):
         self.clear()
 
 
+    def update_records(self, records) -> None:
+        """
+        Actualiza varios registros de la tabla de datos (TreeView) en una sola pasada. 
+        Los registros que no estén en la tabla se ignoran.
+
+        Parámetros:
+          - records (iterable de dict) : registros actualizados, con claves id, name y number
+        """
+        for record in records:
+            iid = str(record['id'])
+            if self.tree_view.exists(iid):
+                data = [record['id'], record['name'], record['number']]
+                self.tree_view.item(iid, values=data)
+
+        # Limpiar inputs
+        self.clear()
+
+
     def remove_one(self) -> None:
         """
         Elimina el registro seleccionado de la base de datos (delega en el controlador). 
@@ -330,18 +396,35 @@ class MainWindow(Tk):
         """
         row = self.tree_view.focus()
         self.tree_view.delete(row)
+        self.row_count -= 1
         
         # Limpiar inputs
         self.clear()
 
 
+    def remove_records(self, ids) -> None:
+        """
+        Elimina varios registros de la tabla de datos (TreeView) a partir de sus IDs. Los 
+        que no estén en la tabla se ignoran.
+
+        Parámetros:
+          - ids (iterable de int) : IDs de los registros a eliminar
+        """
+        rows = [str(id) for id in ids if self.tree_view.exists(str(id))]
+        self.tree_view.delete(*rows)
+        self.row_count -= len(rows)
+
+        # Limpiar inputs
+        self.clear()
+
+
     def remove_all(self) -> None:
         """
         Elimina todos los datos de la tabla actual de la base de datos (delega en el 
         controlador). Actualiza la tabla de datos (TreeView) para reflejar los cambios.
         """
-        for row in self.tree_view.get_children():
-            self.tree_view.delete(row)
+        self.tree_view.delete(*self.tree_view.get_children())
+        self.row_count = 0
 
         # Limpiar inputs
         self.clear()